@@ -0,0 +1,68 @@
+"""
+Microbenchmark del costo por petición de la dependencia de autenticación.
+
+Compara obtener_usuario_actual con y sin la caché de tokens decodificados.
+La caché de usuarios se precalienta para que la medición no incluya la ida
+a MongoDB y solo refleje el trabajo de CPU de la autenticación.
+
+Uso (desde la carpeta backend):
+    python benchmark_autenticacion.py [iteraciones]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark_turnos')
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import server
+
+USUARIO = {
+    "id": "benchmark-usuario",
+    "nombre": "Funcionario Benchmark",
+    "email": "benchmark@unad.edu.co",
+    "rol": "funcionario",
+    "activo": True,
+    "servicios_asignados": ["servicio-a", "servicio-b"],
+    "modulo": "Módulo 1",
+    "fecha_creacion": "2024-01-01T00:00:00+00:00"
+}
+
+async def medir(iteraciones: int, max_tokens: int) -> float:
+    server.cache_tokens = server.CacheTokens(max_tokens)
+    server.cache_usuarios.limpiar()
+    server.cache_usuarios.guardar(USUARIO["email"], server.Usuario(**USUARIO))
+    server.versiones_token[USUARIO["id"]] = 0
+
+    token = server.crear_access_token(
+        data=server.claims_usuario(USUARIO),
+        expires_delta=timedelta(minutes=server.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    credenciales = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    for _ in range(min(iteraciones, 1000)):
+        await server.obtener_usuario_actual(credenciales)
+
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        await server.obtener_usuario_actual(credenciales)
+    return (time.perf_counter() - inicio) / iteraciones * 1_000_000
+
+async def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    modo = "claims completos" if server.JWT_CLAIMS_COMPLETOS else "solo sub"
+    print(f"Autenticación por petición ({iteraciones} iteraciones, token {modo})")
+
+    sin_cache = await medir(iteraciones, 0)
+    con_cache = await medir(iteraciones, server.JWT_CACHE_MAX or 2000)
+
+    print(f"  jwt.decode en cada petición : {sin_cache:8.2f} µs")
+    print(f"  caché de tokens decodificados: {con_cache:8.2f} µs")
+    print(f"  mejora                        : {sin_cache / con_cache:8.2f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Microbenchmark del costo de serializar una lista grande de turnos.
+
+Compara la ruta anterior (validar cada documento con Pydantic, volver a
+validarlo contra response_model y codificarlo con json) con respuesta_lista,
+que da forma a los documentos con la plantilla del modelo y los codifica
+directamente. También compara el tamaño y el costo de codificar un evento de
+Socket.IO con el perfil del personal y el de la pantalla, en JSON y MessagePack
+(si el paquete msgpack está instalado). No requiere MongoDB: los documentos se
+generan en memoria.
+
+Uso (desde la carpeta backend):
+    python benchmark_serializacion.py [filas] [iteraciones]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark_turnos')
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from socketio.packet import EVENT, Packet
+
+try:
+    from socketio.msgpack_packet import MsgPackPacket
+except ImportError:  # msgpack es opcional
+    MsgPackPacket = None
+
+import server
+
+def generar_turnos(filas: int) -> list:
+    inicio = datetime(2024, 1, 1, 8, tzinfo=timezone.utc)
+    return [{
+        "id": f"turno-{i}",
+        "codigo": f"A{i:04d}",
+        "servicio_id": "servicio-a",
+        "servicio_nombre": "Admisiones",
+        "tipo_documento": "CC",
+        "numero_documento": str(1000000000 + i),
+        "nombre_completo": f"Cliente {i}",
+        "telefono": "3001234567",
+        "correo": f"cliente{i}@test.com",
+        "tipo_usuario": "estudiante",
+        "prioridad": None,
+        "prioridad_rango": server.RANGO_SIN_PRIORIDAD,
+        "estado": "espera",
+        "fecha_creacion": (inicio + timedelta(seconds=i)).isoformat(),
+        "creado_por": "benchmark-usuario",
+    } for i in range(filas)]
+
+async def ruta_anterior(turnos: list) -> bytes:
+    campo = create_response_field(name="Response", type_=List[server.Turno])
+    contenido = await serialize_response(
+        field=campo,
+        response_content=[server.Turno(**t) for t in turnos],
+        is_coroutine=True
+    )
+    return JSONResponse(contenido).body
+
+async def ruta_nueva(turnos: list) -> bytes:
+    return server.respuesta_lista(turnos, server.Turno).body
+
+async def medir(ruta, turnos: list, iteraciones: int) -> float:
+    await ruta(turnos)
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        await ruta(turnos)
+    return (time.perf_counter() - inicio) / iteraciones * 1000
+
+def medir_paquetes(turno: dict, iteraciones: int):
+    delta = server.delta_turno("turno_llamado", {**turno, "estado": "llamado", "modulo": "Módulo 1"})
+    for sala in (server.SALA_VAP, server.SALA_PANTALLA):
+        mensaje = server.delta_para_sala(delta, sala)
+        for nombre, clase in (("json", Packet), ("msgpack", MsgPackPacket)):
+            if clase is None:
+                print(f"  {sala:9} {nombre:8}: paquete msgpack no instalado")
+                continue
+            paquete = clase(packet_type=EVENT, data=["turno_llamado", mensaje], namespace="/")
+            codificado = paquete.encode()
+            inicio = time.perf_counter()
+            for _ in range(iteraciones):
+                paquete.encode()
+            costo = (time.perf_counter() - inicio) / iteraciones * 1_000_000
+            print(f"  {sala:9} {nombre:8}: {len(codificado):5d} bytes, {costo:6.2f} µs por paquete")
+
+async def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    codificador = "orjson" if server.orjson is not None else "json"
+    print(f"Serialización de {filas} turnos ({iteraciones} iteraciones, {codificador})")
+
+    turnos = generar_turnos(filas)
+    anterior = await medir(ruta_anterior, turnos, iteraciones)
+    nueva = await medir(ruta_nueva, turnos, iteraciones)
+
+    print(f"  validación Pydantic doble : {anterior:8.2f} ms")
+    print(f"  respuesta_lista           : {nueva:8.2f} ms")
+    print(f"  mejora                    : {anterior / nueva:8.2f}x")
+
+    print("Evento turno_llamado de Socket.IO por perfil de sala")
+    medir_paquetes(turnos[0], iteraciones * 100)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Benchmark de escalado con varios workers de uvicorn compartiendo Socket.IO.
+
+Para cada cantidad de workers levanta `uvicorn server:app --workers N` con el bus
+indicado en SOCKETIO_GESTOR (mongo por defecto), conecta clientes VAP por websocket
+(cada conexión queda en un worker), genera turnos en paralelo por HTTP y mide el
+rendimiento de las peticiones, los eventos entregados a todos los clientes y la
+latencia desde la petición hasta la llegada del evento.
+
+Requiere MongoDB (MONGO_URL). Usa su propia base de datos, que se reinicia con
+init_db.py antes de cada corrida.
+
+Uso (desde la carpeta backend):
+    python benchmark_trabajadores.py [turnos] [clientes] [workers ...]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark_trabajadores')
+os.environ.setdefault('SOCKETIO_GESTOR', 'mongo')
+
+import requests
+import socketio
+
+import init_db
+
+PUERTO = int(os.environ.get('BENCHMARK_PUERTO', '8011'))
+URL = f"http://127.0.0.1:{PUERTO}"
+CONCURRENCIA = 32
+
+def iniciar_servidor(workers: int) -> subprocess.Popen:
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(PUERTO),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=os.environ.copy()
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"{URL}/api/turnos/llamados-recientes", timeout=1)
+            # Se da tiempo a que todos los workers terminen su arranque
+            time.sleep(2)
+            return proceso
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("El servidor no respondió")
+
+def iniciar_sesion(email: str, password: str) -> str:
+    respuesta = requests.post(f"{URL}/api/auth/login", json={"email": email, "password": password}, timeout=30)
+    respuesta.raise_for_status()
+    return respuesta.json()["access_token"]
+
+def conectar_clientes(cantidad: int, token: str, llegadas: dict, candado: threading.Lock) -> list:
+    clientes = []
+    for _ in range(cantidad):
+        cliente = socketio.Client()
+
+        def registrar(evento):
+            with candado:
+                llegadas.setdefault(evento["id"], []).append(time.perf_counter())
+
+        cliente.on("turno_generado", registrar)
+        cliente.on("turnos_lote", lambda lote: [registrar(evento) for evento in lote["eventos"]])
+        # Solo websocket: sin sesiones fijas, el sondeo HTTP podría caer en otro worker
+        cliente.connect(URL, auth={"token": token}, transports=["websocket"])
+        clientes.append(cliente)
+    return clientes
+
+def generar_turnos(cantidad: int, token: str, servicio_id: str) -> dict:
+    sesiones = threading.local()
+    inicios = {}
+
+    def generar(i: int):
+        if not hasattr(sesiones, "sesion"):
+            sesiones.sesion = requests.Session()
+            sesiones.sesion.headers["Authorization"] = f"Bearer {token}"
+        inicio = time.perf_counter()
+        respuesta = sesiones.sesion.post(f"{URL}/api/turnos/generar", json={
+            "servicio_id": servicio_id,
+            "tipo_documento": "CC",
+            "numero_documento": str(1000000000 + i),
+            "nombre_completo": f"Cliente {i}",
+            "telefono": "3001234567",
+            "correo": f"cliente{i}@test.com",
+            "tipo_usuario": "estudiante"
+        }, timeout=30)
+        respuesta.raise_for_status()
+        inicios[respuesta.json()["id"]] = inicio
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCIA) as executor:
+        list(executor.map(generar, range(cantidad)))
+    return inicios
+
+def percentil(valores: list, p: float) -> float:
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+def medir(workers: int, turnos: int, clientes: int):
+    asyncio.run(init_db.inicializar_base_datos())
+    proceso = iniciar_servidor(workers)
+    try:
+        token = iniciar_sesion("vap@unad.edu.co", "vap123")
+        servicios = requests.get(f"{URL}/api/servicios", headers={"Authorization": f"Bearer {token}"}, timeout=30).json()
+        llegadas: dict = {}
+        candado = threading.Lock()
+        conectados = conectar_clientes(clientes, token, llegadas, candado)
+
+        inicio = time.perf_counter()
+        inicios = generar_turnos(turnos, token, servicios[0]["id"])
+        duracion_http = time.perf_counter() - inicio
+
+        esperados = turnos * clientes
+        limite = time.perf_counter() + 10
+        while time.perf_counter() < limite:
+            with candado:
+                if sum(len(tiempos) for tiempos in llegadas.values()) >= esperados:
+                    break
+            time.sleep(0.05)
+        for cliente in conectados:
+            cliente.disconnect()
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    latencias = sorted(
+        (llegada - inicios[turno_id]) * 1000
+        for turno_id, tiempos in llegadas.items() if turno_id in inicios
+        for llegada in tiempos
+    )
+    ultima = max((max(tiempos) for tiempos in llegadas.values()), default=inicio)
+    print(f"  {workers} worker(s): {turnos / duracion_http:8.1f} turnos/s | "
+          f"{len(latencias) / (ultima - inicio):9.1f} eventos/s | "
+          f"entregados {len(latencias)}/{esperados} | "
+          f"latencia p50 {percentil(latencias, 0.5):7.1f} ms, p99 {percentil(latencias, 0.99):7.1f} ms")
+
+def main():
+    turnos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    workers = [int(n) for n in sys.argv[3:]] or [1, 2, 4]
+    print(f"Escalado con workers ({turnos} turnos, {clientes} clientes VAP, bus {os.environ['SOCKETIO_GESTOR']})")
+    for cantidad in workers:
+        medir(cantidad, turnos, clientes)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,42 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, CursorType, IndexModel, ReturnDocument
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
 import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import Callable, List, Optional, Union
 from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
 from io import BytesIO
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from abc import ABC, abstractmethod
+import asyncio
+import base64
+import bisect
+import hashlib
+import heapq
+import json
+import time
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional, se usa json estándar
+    orjson = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -24,14 +45,302 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+def variable_booleana(nombre: str, defecto: bool = False) -> bool:
+    """Lee una variable de entorno de sí/no (1, true, si o yes activan la opción)"""
+    valor = os.environ.get(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'yes')
+
 SECRET_KEY = os.environ.get('SECRET_KEY', 'tu-clave-secreta-super-segura-cambiala-en-produccion')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
 
+USUARIOS_CACHE_TTL = float(os.environ.get('USUARIOS_CACHE_TTL', '30'))
+USUARIOS_CACHE_MAX = int(os.environ.get('USUARIOS_CACHE_MAX', '1000'))
+
+ZONA_HORARIA = ZoneInfo(os.environ.get('ZONA_HORARIA', 'America/Bogota'))
+# Reinicia la numeración de los códigos de turno cada día (A-001 cada mañana)
+REINICIO_DIARIO_CODIGOS = variable_booleana('REINICIO_DIARIO_CODIGOS')
+
+JWT_CACHE_MAX = int(os.environ.get('JWT_CACHE_MAX', '2000'))
+
+COLA_RECONCILIACION_SEGUNDOS = float(os.environ.get('COLA_RECONCILIACION_SEGUNDOS', '30'))
+
+# Eventos de turno que se conservan por sala para reponerlos a los clientes que se reconectan
+EVENTOS_DIARIO_MAX = int(os.environ.get('EVENTOS_DIARIO_MAX', '500'))
+# Copia opcional del diario en una colección capped de MongoDB (sobrevive a reinicios)
+EVENTOS_DIARIO_MONGO = variable_booleana('EVENTOS_DIARIO_MONGO')
+EVENTOS_DIARIO_MONGO_BYTES = int(os.environ.get('EVENTOS_DIARIO_MONGO_BYTES', str(16 * 1024 * 1024)))
+
+# Cola de salida de Socket.IO: tamaño máximo, mensajes por lote y paquetes pendientes por cliente
+EVENTOS_COLA_MAX = int(os.environ.get('EVENTOS_COLA_MAX', '10000'))
+EVENTOS_LOTE_MAX = int(os.environ.get('EVENTOS_LOTE_MAX', '100'))
+EVENTOS_PENDIENTES_CLIENTE = int(os.environ.get('EVENTOS_PENDIENTES_CLIENTE', '64'))
+# Mensajes que se retienen para un cliente lento antes de descartar los más antiguos
+EVENTOS_RETENIDOS_PANTALLA = int(os.environ.get('EVENTOS_RETENIDOS_PANTALLA', '20'))
+EVENTOS_RETENIDOS_PERSONAL = int(os.environ.get('EVENTOS_RETENIDOS_PERSONAL', '200'))
+# Ventana (ms) en la que se agrupan los eventos de cada sala en un solo `turnos_lote`; 0 la desactiva
+EVENTOS_VENTANA_MS = float(os.environ.get('EVENTOS_VENTANA_MS', '0'))
+
+# Bus entre workers de Socket.IO: local (un solo proceso), memoria (pruebas), mongo o redis
+SOCKETIO_GESTOR = os.environ.get('SOCKETIO_GESTOR', 'local').lower()
+SOCKETIO_BUS_URL = os.environ.get('SOCKETIO_BUS_URL', 'redis://localhost:6379/0')
+SOCKETIO_BUS_MONGO_BYTES = int(os.environ.get('SOCKETIO_BUS_MONGO_BYTES', str(16 * 1024 * 1024)))
+# Espera máxima (ms) por un evento anterior que publicó otro worker antes de entregar con hueco
+EVENTOS_REORDEN_MS = float(os.environ.get('EVENTOS_REORDEN_MS', '500'))
+# Codificación de los paquetes de Socket.IO: json o msgpack (requiere el paquete msgpack y
+# que el frontend se construya con REACT_APP_SOCKET_MSGPACK=true)
+SOCKETIO_SERIALIZADOR = os.environ.get('SOCKETIO_SERIALIZADOR', 'json').lower()
+# Nombre que espera python-socketio para cada codificación
+SERIALIZADORES_SOCKETIO = {"json": "default", "msgpack": "msgpack"}
+if SOCKETIO_SERIALIZADOR not in SERIALIZADORES_SOCKETIO:
+    raise RuntimeError(
+        f"SOCKETIO_SERIALIZADOR inválido: {SOCKETIO_SERIALIZADOR!r} (use {' o '.join(SERIALIZADORES_SOCKETIO)})"
+    )
+
+# Stream SSE de la pantalla pública: eventos que guarda el buffer compartido, atraso máximo de
+# una conexión antes de reenviarle la instantánea y latido para que los proxies no la cierren
+SSE_BUFFER_EVENTOS = int(os.environ.get('SSE_BUFFER_EVENTOS', '256'))
+SSE_PENDIENTES_MAX = int(os.environ.get('SSE_PENDIENTES_MAX', '64'))
+SSE_LATIDO_SEGUNDOS = float(os.environ.get('SSE_LATIDO_SEGUNDOS', '15'))
+
+# Turnos llamados que se guardan en memoria para la pantalla pública (se muestran LLAMADOS_RECIENTES)
+LLAMADOS_BUFFER = int(os.environ.get('LLAMADOS_BUFFER', '50'))
+
+PAGINA_MAXIMA = int(os.environ.get('PAGINA_MAXIMA', '500'))
+
+PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', '4'))
+
+# Si está activo, el token lleva rol, servicios y módulo firmados y se autoriza sin leer la BD
+JWT_CLAIMS_COMPLETOS = variable_booleana('JWT_CLAIMS_COMPLETOS')
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+class OrdenEventos:
+    """
+    Con varios workers, entrega los eventos de turno de cada sala en orden de secuencia.
+    Dos workers pueden publicar números consecutivos de una sala en orden inverso: el que
+    llega antes de tiempo se retiene hasta que llegue el anterior o pasen `espera`
+    segundos (entonces se entrega con el hueco y el cliente lo repone con `reanudar`).
+    Al entregar, el evento pasa al diario en memoria de este worker.
+    """
+
+    def __init__(self, espera: float):
+        self.espera = espera
+        self._entregadas: dict = {}
+        # Última entregada de una sala sin base; None acepta lo primero que llegue
+        self._inicial: Optional[int] = None
+        self._retenidos: dict = {}
+        self._vencimientos: dict = {}
+        self.reordenados = 0
+        self.huecos = 0
+        self.tardios = 0
+
+    def base(self, secuencias: dict):
+        """Números ya reservados al compartir la numeración; las salas nuevas empiezan en 1"""
+        self._entregadas.update(secuencias)
+        self._inicial = 0
+
+    @staticmethod
+    def _secuencias(datos: dict) -> tuple:
+        eventos = datos["eventos"] if "eventos" in datos else [datos]
+        return eventos, eventos[0]["seq"], eventos[-1]["seq"]
+
+    async def recibir(self, mensaje: dict, entregar):
+        datos = mensaje.get("data")
+        # Solo se ordenan las emisiones a la sala del evento (no las retenidas de un cliente)
+        if not isinstance(datos, dict) or "sala" not in datos or mensaje.get("room") != datos["sala"]:
+            return await entregar(mensaje)
+        sala = datos["sala"]
+        _, primera, _ = self._secuencias(datos)
+        ultima = self._entregadas.get(sala, self._inicial)
+        if ultima is not None and primera <= ultima:
+            self.tardios += 1
+            return
+        if ultima is not None and primera > ultima + 1:
+            self._retenidos.setdefault(sala, {})[primera] = (mensaje, entregar)
+            self.reordenados += 1
+            if sala not in self._vencimientos:
+                self._vencimientos[sala] = asyncio.create_task(self._vencer(sala))
+            return
+        await self._entregar(sala, mensaje, entregar)
+        await self._liberar(sala)
+
+    async def _entregar(self, sala: str, mensaje: dict, entregar):
+        eventos, _, ultima = self._secuencias(mensaje["data"])
+        self._entregadas[sala] = ultima
+        for evento in eventos:
+            evento_entregado(evento)
+        await entregar(mensaje)
+
+    async def _liberar(self, sala: str, forzar: bool = False):
+        retenidos = self._retenidos.get(sala, {})
+        while retenidos:
+            primera = min(retenidos)
+            entregada = self._entregadas.get(sala, 0)
+            if primera <= entregada:
+                retenidos.pop(primera)
+                self.tardios += 1
+            elif forzar or primera == entregada + 1:
+                await self._entregar(sala, *retenidos.pop(primera))
+            else:
+                return
+        self._retenidos.pop(sala, None)
+        vencimiento = self._vencimientos.pop(sala, None)
+        if vencimiento is not None and vencimiento is not asyncio.current_task():
+            vencimiento.cancel()
+
+    async def _vencer(self, sala: str):
+        await asyncio.sleep(self.espera)
+        self.huecos += 1
+        await self._liberar(sala, forzar=True)
+
+    def metricas(self) -> dict:
+        return {
+            "retenidos": sum(len(retenidos) for retenidos in self._retenidos.values()),
+            "reordenados": self.reordenados,
+            "huecos": self.huecos,
+            "tardios": self.tardios
+        }
+
+class BusProcesos(AsyncPubSubManager, ABC):
+    """
+    Base de los gestores de Socket.IO que comparten salas entre workers. Además de los
+    mensajes de Socket.IO, el bus lleva avisos de estado ({"method": "estado"}) con los que
+    cada worker mantiene al día su cola en memoria, cachés y salas (ver aplicar_aviso), y
+    los eventos de turno pasan por OrdenEventos antes de entregarse a los sockets locales.
+    Las subclases implementan _publish y _recibir (mensajes crudos del transporte).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.orden = OrdenEventos(EVENTOS_REORDEN_MS / 1000)
+        self.avisos_enviados = 0
+        self.avisos_recibidos = 0
+
+    async def preparar(self):
+        """Prepara el transporte antes de empezar a escuchar"""
+
+    @abstractmethod
+    def _recibir(self):
+        """Generador asíncrono de los mensajes crudos que llegan por el transporte"""
+
+    async def avisar(self, aviso: dict):
+        self.avisos_enviados += 1
+        await self._publish({"method": "estado", "aviso": aviso, "host_id": self.host_id})
+
+    async def _listen(self):
+        async for mensaje in self._recibir():
+            datos = mensaje
+            if not isinstance(datos, dict):
+                try:
+                    datos = json.loads(mensaje)
+                except ValueError:
+                    continue
+            if not isinstance(datos, dict) or datos.get("method") != "estado":
+                yield datos
+            elif datos.get("host_id") != self.host_id:
+                self.avisos_recibidos += 1
+                try:
+                    await aplicar_aviso(datos["aviso"])
+                except Exception:
+                    logger.exception("Error al aplicar el aviso %s de otro worker", datos["aviso"].get("tipo"))
+
+    async def _handle_emit(self, message):
+        await self.orden.recibir(message, super()._handle_emit)
+
+    def metricas(self) -> dict:
+        return {
+            "gestor": self.name,
+            "avisos_enviados": self.avisos_enviados,
+            "avisos_recibidos": self.avisos_recibidos,
+            **self.orden.metricas()
+        }
+
+class GestorMemoria(BusProcesos):
+    """Bus dentro del proceso, para pruebas con varios servidores Socket.IO haciendo de workers"""
+    name = 'memoria'
+    _suscriptores: dict = {}
+
+    async def _publish(self, data):
+        # Cada servidor recibe su propia copia serializada, como con un bus real
+        mensaje = json.dumps(data)
+        for cola in GestorMemoria._suscriptores.get(self.channel, []):
+            cola.put_nowait(mensaje)
+
+    async def _recibir(self):
+        cola: asyncio.Queue = asyncio.Queue()
+        suscriptores = GestorMemoria._suscriptores.setdefault(self.channel, [])
+        suscriptores.append(cola)
+        try:
+            while True:
+                yield await cola.get()
+        finally:
+            suscriptores.remove(cola)
+
+class GestorMongo(BusProcesos):
+    """
+    Bus sobre una colección capped de MongoDB que cada worker lee con un cursor tailable
+    (funciona también con un servidor sin réplicas, a diferencia de los change streams).
+    """
+    name = 'mongo'
+
+    def __init__(self, tamano: int, coleccion: str = 'bus_socketio'):
+        super().__init__(channel=coleccion)
+        self.tamano = tamano
+
+    async def preparar(self):
+        try:
+            await db.create_collection(self.channel, capped=True, size=self.tamano)
+        except CollectionInvalid:
+            pass
+        # Un cursor tailable sobre una colección vacía se cierra de inmediato
+        if await db[self.channel].find_one({}, {"_id": 1}) is None:
+            await db[self.channel].insert_one({"method": "inicio", "host_id": self.host_id})
+
+    async def _publish(self, data):
+        await db[self.channel].insert_one(dict(data))
+
+    async def _recibir(self):
+        coleccion = db[self.channel]
+        # Se lee desde el último mensaje existente: lo anterior al arranque no interesa
+        ultimo = await coleccion.find_one({}, {"_id": 1}, sort=[("$natural", DESCENDING)])
+        filtro = {"_id": {"$gt": ultimo["_id"]}} if ultimo else {}
+        while True:
+            cursor = coleccion.find(filtro, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                async for documento in cursor:
+                    filtro = {"_id": {"$gt": documento.pop("_id")}}
+                    yield documento
+            # El cursor muere si la colección dio la vuelta antes de leerlo; se reabre
+            logger.warning("Cursor del bus de Socket.IO cerrado; se vuelve a abrir")
+            await asyncio.sleep(0.5)
+
+class GestorRedis(BusProcesos, socketio.AsyncRedisManager):
+    """Bus sobre Redis pub/sub (requiere el paquete redis)"""
+    name = 'redis'
+
+    def _recibir(self):
+        return socketio.AsyncRedisManager._listen(self)
+
+def crear_gestor_socketio() -> Optional[socketio.AsyncManager]:
+    if SOCKETIO_GESTOR == "memoria":
+        return GestorMemoria()
+    if SOCKETIO_GESTOR == "mongo":
+        return GestorMongo(SOCKETIO_BUS_MONGO_BYTES)
+    if SOCKETIO_GESTOR == "redis":
+        return GestorRedis(SOCKETIO_BUS_URL)
+    # Gestor en memoria de python-socketio: las salas solo existen en este proceso
+    return None
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    client_manager=crear_gestor_socketio(),
+    serializer=SERIALIZADORES_SOCKETIO[SOCKETIO_SERIALIZADOR]
+)
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
@@ -98,6 +407,7 @@ class Turno(BaseModel):
     codigo: str
     servicio_id: str
     servicio_nombre: str
+    servicio_anterior_id: Optional[str] = None
     prioridad: Optional[str] = None
     estado: str
     observaciones: Optional[str] = None
@@ -117,6 +427,30 @@ class Turno(BaseModel):
     correo: EmailStr
     tipo_usuario: str
 
+class TurnoResumen(BaseModel):
+    """Vista compacta de un turno en cola: lo necesario para pintar las listas de los tableros"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    codigo: str
+    servicio_id: str
+    servicio_nombre: str
+    prioridad: Optional[str] = None
+    # Orden de la cola (ver ORDEN_COLA): permite a los clientes reordenar al aplicar eventos
+    prioridad_rango: Optional[int] = None
+    estado: str
+    fecha_creacion: str
+
+class TurnoPantalla(BaseModel):
+    """Vista pública de un turno llamado: lo que anuncia la pantalla, sin documento ni datos de contacto"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    codigo: str
+    servicio_nombre: str
+    estado: str
+    modulo: Optional[str] = None
+    nombre_completo: Optional[str] = None
+    fecha_llamado: Optional[str] = None
+
 class TurnoCreate(BaseModel):
     servicio_id: str
     prioridad: Optional[str] = None
@@ -132,6 +466,10 @@ class TurnoLlamar(BaseModel):
     turno_id: str
     modulo: Optional[str] = None
 
+class TurnoLlamarSiguiente(BaseModel):
+    servicio_id: Optional[str] = None
+    modulo: Optional[str] = None
+
 class TurnoAtender(BaseModel):
     turno_id: str
 
@@ -151,11 +489,276 @@ class ConfiguracionUpdate(BaseModel):
     impresion_habilitada: Optional[bool] = None
     prioridades: Optional[List[str]] = None
 
-def verificar_password(password_plano: str, password_hash: str) -> bool:
-    return pwd_context.verify(password_plano, password_hash)
+def codificar_json(contenido) -> bytes:
+    """JSON compacto en UTF-8, con orjson cuando está instalado"""
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse que usa orjson cuando está instalado"""
+
+    def render(self, content) -> bytes:
+        return codificar_json(content)
+
+@lru_cache(maxsize=None)
+def plantilla_modelo(modelo) -> tuple:
+    """Campos de un modelo de respuesta con su valor por defecto (None si es obligatorio)"""
+    return tuple(
+        (campo, None if info.is_required() else info.get_default(call_default_factory=True))
+        for campo, info in modelo.model_fields.items()
+    )
+
+def respuesta_lista(documentos: List[dict], modelo) -> RespuestaJSON:
+    """
+    Serializa documentos de confianza (leídos de la BD o de la cola en memoria) con la
+    forma de `modelo`, sin validarlos con Pydantic: devolver una Response directamente
+    evita también la segunda validación de response_model.
+    """
+    return RespuestaJSON(formar_documentos(documentos, modelo))
+
+def formar_documentos(documentos: List[dict], modelo) -> List[dict]:
+    """Documentos con exactamente los campos de `modelo` (los faltantes con su valor por defecto)"""
+    plantilla = plantilla_modelo(modelo)
+    return [{campo: doc.get(campo, defecto) for campo, defecto in plantilla} for doc in documentos]
+
+class CacheUsuarios:
+    """Caché en proceso de usuarios autenticados, con TTL corto y tamaño acotado (LRU)"""
+
+    def __init__(self, ttl: float, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, email: str) -> Optional[Usuario]:
+        entrada = self._entradas.get(email)
+        if entrada is None:
+            self.fallos += 1
+            return None
+        usuario, expira = entrada
+        if expira <= time.monotonic():
+            del self._entradas[email]
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(email)
+        self.aciertos += 1
+        return usuario
+
+    def guardar(self, email: str, usuario: Usuario):
+        if self.ttl <= 0 or self.max_entradas <= 0:
+            return
+        self._entradas[email] = (usuario, time.monotonic() + self.ttl)
+        self._entradas.move_to_end(email)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def invalidar(self, usuario_id: str):
+        # Se busca por id porque el email puede haber cambiado en la actualización
+        emails = [email for email, (u, _) in self._entradas.items() if u.id == usuario_id]
+        for email in emails:
+            del self._entradas[email]
+        self.invalidaciones += 1
+
+    def limpiar(self):
+        self._entradas.clear()
+
+    def metricas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "invalidaciones": self.invalidaciones,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0
+        }
+
+cache_usuarios = CacheUsuarios(USUARIOS_CACHE_TTL, USUARIOS_CACHE_MAX)
+
+class CacheTokens:
+    """LRU de payloads JWT ya verificados, indexado por hash del token y válido hasta su exp"""
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+
+    @staticmethod
+    def _clave(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def obtener(self, token: str) -> Optional[dict]:
+        if self.max_entradas <= 0:
+            return None
+        clave = self._clave(token)
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+        payload, expira = entrada
+        if expira <= time.time():
+            del self._entradas[clave]
+            self.expirados += 1
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return payload
+
+    def guardar(self, token: str, payload: dict):
+        expira = payload.get("exp")
+        if self.max_entradas <= 0 or not isinstance(expira, (int, float)):
+            return
+        self._entradas[self._clave(token)] = (payload, expira)
+        if len(self._entradas) > self.max_entradas:
+            self._purgar_expirados()
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def _purgar_expirados(self):
+        ahora = time.time()
+        expiradas = [clave for clave, (_, expira) in self._entradas.items() if expira <= ahora]
+        for clave in expiradas:
+            del self._entradas[clave]
+        self.expirados += len(expiradas)
+
+    def metricas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "expirados": self.expirados,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0
+        }
 
-def obtener_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+cache_tokens = CacheTokens(JWT_CACHE_MAX)
+
+class PoolPasswords:
+    """Ejecuta bcrypt en un pool de hilos acotado para no bloquear el event loop"""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._semaforo = asyncio.Semaphore(self.workers)
+        self.en_espera = 0
+        self.en_ejecucion = 0
+        self.max_en_espera = 0
+        self.completadas = 0
+        self.tiempo_espera_total = 0.0
+
+    async def ejecutar(self, funcion, *args):
+        inicio = time.monotonic()
+        if self._semaforo.locked():
+            self.en_espera += 1
+            self.max_en_espera = max(self.max_en_espera, self.en_espera)
+            try:
+                await self._semaforo.acquire()
+            finally:
+                self.en_espera -= 1
+        else:
+            await self._semaforo.acquire()
+        self.tiempo_espera_total += time.monotonic() - inicio
+        self.en_ejecucion += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, funcion, *args)
+        finally:
+            self.en_ejecucion -= 1
+            self.completadas += 1
+            self._semaforo.release()
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False)
+
+    def metricas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "en_espera": self.en_espera,
+            "en_ejecucion": self.en_ejecucion,
+            "max_en_espera": self.max_en_espera,
+            "completadas": self.completadas,
+            "espera_promedio_ms": round(self.tiempo_espera_total * 1000 / self.completadas, 2) if self.completadas else 0.0
+        }
+
+pool_passwords = PoolPasswords(PASSWORD_POOL_WORKERS)
+
+class VersionesRecursos:
+    """
+    ETag de los recursos que se consultan por sondeo. El ETag es un resumen del cuerpo de
+    la respuesta, así todos los workers (y los reinicios) dan el mismo para los mismos
+    datos. Se guarda en memoria hasta que una escritura (o el aviso de otro worker)
+    incrementa la versión del recurso: mientras tanto un cliente con el ETag vigente
+    recibe 304 sin que se consulte la BD.
+    """
+
+    def __init__(self):
+        self._versiones: dict = {}
+        self._etags: dict = {}
+        self.no_modificados = 0
+        self.completos = 0
+
+    def vigente(self, recurso: str) -> tuple:
+        """(ETag conocido o None, versión); la versión se toma antes de leer los datos"""
+        return self._etags.get(recurso), self._versiones.get(recurso, 0)
+
+    def incrementar(self, recurso: str):
+        self._versiones[recurso] = self._versiones.get(recurso, 0) + 1
+        self._etags.pop(recurso, None)
+
+    def no_modificado(self, request: Request, etag: Optional[str]) -> Optional[Response]:
+        """Respuesta 304 si el If-None-Match del cliente incluye `etag`, si no None"""
+        candidatos = request.headers.get("if-none-match")
+        if etag and candidatos and etag in (c.strip().removeprefix("W/") for c in candidatos.split(",")):
+            self.no_modificados += 1
+            return self._cabeceras(Response(status_code=status.HTTP_304_NOT_MODIFIED), etag)
+        return None
+
+    def publicar(self, request: Request, response: Response, recurso: str, version: int) -> Response:
+        """
+        Agrega el ETag calculado del cuerpo. Solo se guarda si ninguna escritura cambió
+        el recurso mientras se leía (si no, la siguiente lectura lo recalcula). Si el
+        cliente ya tenía ese ETag (p. ej. de otro worker) se responde 304 igualmente.
+        """
+        etag = f'"{recurso}-{hashlib.blake2b(response.body, digest_size=12).hexdigest()}"'
+        if self._versiones.get(recurso, 0) == version:
+            self._etags[recurso] = etag
+        no_modificado = self.no_modificado(request, etag)
+        if no_modificado is not None:
+            return no_modificado
+        self.completos += 1
+        return self._cabeceras(response, etag)
+
+    @staticmethod
+    def _cabeceras(response: Response, etag: str) -> Response:
+        # no-cache: el navegador guarda la respuesta pero la revalida con If-None-Match
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def metricas(self) -> dict:
+        total = self.no_modificados + self.completos
+        return {
+            "versiones": dict(self._versiones),
+            "no_modificados": self.no_modificados,
+            "completos": self.completos,
+            "tasa_no_modificados": round(self.no_modificados / total, 4) if total else 0.0
+        }
+
+versiones_recursos = VersionesRecursos()
+
+async def verificar_password(password_plano: str, password_hash: str) -> bool:
+    return await pool_passwords.ejecutar(pwd_context.verify, password_plano, password_hash)
+
+async def obtener_password_hash(password: str) -> str:
+    return await pool_passwords.ejecutar(pwd_context.hash, password)
 
 def crear_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -167,6 +770,42 @@ def crear_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Última versión de token conocida por usuario (None = usuario eliminado)
+versiones_token: dict = {}
+
+def claims_usuario(usuario: dict) -> dict:
+    """Construye los claims del token; en modo de claims completos incluye los datos de autorización"""
+    claims = {"sub": usuario["email"]}
+    if JWT_CLAIMS_COMPLETOS:
+        claims.update({
+            "uid": usuario["id"],
+            "nombre": usuario["nombre"],
+            "rol": usuario["rol"],
+            "servicios": usuario.get("servicios_asignados", []),
+            "modulo": usuario.get("modulo"),
+            "fecha_creacion": usuario["fecha_creacion"],
+            "ver": usuario.get("token_version", 0)
+        })
+    return claims
+
+def usuario_desde_claims(payload: dict) -> Optional[Usuario]:
+    """Devuelve el usuario firmado en el token si su versión sigue vigente"""
+    usuario_id = payload.get("uid")
+    if usuario_id is None or "ver" not in payload:
+        return None
+    if usuario_id not in versiones_token or versiones_token[usuario_id] != payload["ver"]:
+        return None
+    return Usuario.model_construct(
+        id=usuario_id,
+        nombre=payload["nombre"],
+        email=payload["sub"],
+        rol=payload["rol"],
+        activo=True,
+        servicios_asignados=payload.get("servicios", []),
+        modulo=payload.get("modulo"),
+        fecha_creacion=payload["fecha_creacion"]
+    )
+
 async def obtener_usuario_actual(credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -175,17 +814,32 @@ async def obtener_usuario_actual(credentials: HTTPAuthorizationCredentials = Dep
     )
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = cache_tokens.obtener(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            cache_tokens.guardar(token, payload)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    usuario = await db.usuarios.find_one({"email": email}, {"_id": 0})
+    if JWT_CLAIMS_COMPLETOS:
+        usuario_token = usuario_desde_claims(payload)
+        if usuario_token is not None:
+            return usuario_token
+    
+    usuario_cache = cache_usuarios.obtener(email)
+    if usuario_cache is not None:
+        return usuario_cache
+    
+    usuario = await db.usuarios.find_one({"email": email}, {"_id": 0, "password_hash": 0})
     if usuario is None:
         raise credentials_exception
-    return Usuario(**usuario)
+    versiones_token[usuario["id"]] = usuario.get("token_version", 0)
+    usuario_modelo = Usuario(**usuario)
+    cache_usuarios.guardar(email, usuario_modelo)
+    return usuario_modelo
 
 def requerir_rol(roles_permitidos: List[str]):
     async def verificar_rol(usuario: Usuario = Depends(obtener_usuario_actual)):
@@ -197,10 +851,647 @@ def requerir_rol(roles_permitidos: List[str]):
         return usuario
     return verificar_rol
 
+SALA_VAP = "vap"
+SALA_ADMINISTRACION = "administracion"
+SALA_PANTALLA = "pantalla"
+# Eventos de turno que recibe la pantalla pública (el redirigido para retirar el turno de la lista)
+EVENTOS_PANTALLA = {"turno_llamado", "turno_atendiendo", "turno_finalizado", "turno_redirigido"}
+
+# Campos que cambia cada transición; turno_generado envía el documento completo.
+# nombre_completo va en el llamado porque la pantalla lo anuncia.
+CAMPOS_EVENTO = {
+    "turno_llamado": ["funcionario_id", "funcionario_nombre", "modulo", "fecha_llamado", "tiempo_espera", "nombre_completo"],
+    "turno_atendiendo": ["fecha_atencion", "modulo", "nombre_completo"],
+    "turno_finalizado": ["fecha_cierre", "tiempo_atencion"],
+    "turno_cancelado": ["fecha_cierre", "funcionario_id", "funcionario_nombre"],
+    "turno_redirigido": ["servicio_anterior_id", "funcionario_id", "funcionario_nombre"],
+}
+
+# Perfil de carga por sala: la pantalla pública solo recibe los campos de TurnoPantalla;
+# las salas del personal reciben el delta completo
+PERFILES_SALA = {SALA_PANTALLA: list(TurnoPantalla.model_fields)}
+
+def sala_servicio(servicio_id: str) -> str:
+    return f"servicio:{servicio_id}"
+
+def sala_usuario(usuario_id: str) -> str:
+    return f"usuario:{usuario_id}"
+
+def salas_usuario(usuario: Usuario) -> List[str]:
+    """Salas de Socket.IO que corresponden al rol del usuario"""
+    if usuario.rol == "administrador":
+        return [SALA_ADMINISTRACION]
+    if usuario.rol == "vap":
+        return [SALA_VAP]
+    return [sala_servicio(servicio_id) for servicio_id in usuario.servicios_asignados]
+
+def salas_turno(evento: str, turno: dict) -> List[str]:
+    """Salas interesadas en un evento de turno: su servicio, VAP, administración y, si aplica, la pantalla"""
+    salas = [sala_servicio(turno["servicio_id"]), SALA_VAP, SALA_ADMINISTRACION]
+    if evento == "turno_redirigido" and turno.get("servicio_anterior_id"):
+        salas.append(sala_servicio(turno["servicio_anterior_id"]))
+    if evento in EVENTOS_PANTALLA:
+        salas.append(SALA_PANTALLA)
+    return salas
+
+class SecuenciasSalas:
+    """
+    Número de secuencia por sala de Socket.IO. Cada evento emitido a una sala lleva el
+    siguiente número, así un cliente detecta que perdió eventos cuando la secuencia salta.
+    La época cambia en cada arranque del proceso (las secuencias vuelven a empezar).
+    Con varios workers, la época y los números se comparten en la colección `secuencias`
+    de MongoDB y actual() es el último número entregado a los sockets de este worker.
+    """
+
+    def __init__(self):
+        self.epoca = format(time.time_ns(), "x")
+        self._secuencias: dict = {}
+        self.compartidas = False
+
+    async def reservar(self, sala: str, cantidad: int) -> int:
+        """Primer número de un bloque de `cantidad` números consecutivos de la sala"""
+        if not self.compartidas:
+            primera = self.actual(sala) + 1
+            self._secuencias[sala] = primera + cantidad - 1
+            return primera
+        documento = await db.secuencias.find_one_and_update(
+            {"_id": sala},
+            {"$inc": {"seq": cantidad}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return documento["seq"] - cantidad + 1
+
+    def entregada(self, sala: str, seq: int):
+        self._secuencias[sala] = max(self.actual(sala), seq)
+
+    def actual(self, sala: str) -> int:
+        return self._secuencias.get(sala, 0)
+
+    async def compartir(self) -> dict:
+        """Adopta la época común de los workers y parte de los números ya reservados"""
+        documento = await db.secuencias.find_one_and_update(
+            {"_id": "__epoca__"},
+            {"$setOnInsert": {"epoca": self.epoca}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        salas = await db.secuencias.find({"_id": {"$ne": "__epoca__"}}).to_list(None)
+        self.restaurar(documento["epoca"], {sala["_id"]: sala["seq"] for sala in salas})
+        self.compartidas = True
+        return dict(self._secuencias)
+
+    def restaurar(self, epoca: str, secuencias: dict):
+        """Continúa la numeración de un arranque anterior (diario persistido en MongoDB)"""
+        self.epoca = epoca
+        self._secuencias = dict(secuencias)
+
+secuencias_salas = SecuenciasSalas()
+
+class DiarioEventos:
+    """
+    Diario acotado de los eventos emitidos, por sala, para reponer a un cliente que se
+    reconecta solo los eventos que perdió. Guarda los últimos `max_por_sala` en memoria y,
+    si está habilitado, una copia en la colección capped `eventos` de MongoDB, de la que
+    se restauran la época y las secuencias al arrancar.
+    """
+
+    def __init__(self, max_por_sala: int, mongo: bool):
+        self.max_por_sala = max(1, max_por_sala)
+        self.mongo = mongo
+        self._salas: dict = {}
+        self._escrituras: set = set()
+        self.reposiciones = 0
+        self.reposiciones_incompletas = 0
+        self.errores_mongo = 0
+
+    def registrar(self, evento: dict) -> bool:
+        """Agrega un evento entregado; False si ya estaba registrado"""
+        sala = self._salas.get(evento["sala"])
+        if sala is None:
+            sala = self._salas[evento["sala"]] = deque(maxlen=self.max_por_sala)
+        if sala and sala[-1]["epoca"] == evento["epoca"] and sala[-1]["seq"] >= evento["seq"]:
+            return False
+        sala.append(evento)
+        secuencias_salas.entregada(evento["sala"], evento["seq"])
+        return True
+
+    def persistir(self, evento: dict):
+        if self.mongo:
+            # La escritura no retrasa la emisión; se conserva la referencia hasta que termine
+            tarea = asyncio.create_task(self._guardar(dict(evento)))
+            self._escrituras.add(tarea)
+            tarea.add_done_callback(self._escrituras.discard)
+
+    async def _guardar(self, evento: dict):
+        try:
+            await db.eventos.insert_one(evento)
+        except Exception:
+            self.errores_mongo += 1
+            logger.exception("Error al guardar el evento %s de la sala %s", evento["seq"], evento["sala"])
+
+    async def desde(self, epoca: str, sala: str, seq: int, hasta: int) -> Optional[List[dict]]:
+        """Eventos de `sala` con secuencia en (seq, hasta], o None si el diario ya no los tiene todos"""
+        if hasta <= seq:
+            return []
+        eventos = self._salas.get(sala)
+        if eventos and eventos[0]["epoca"] == epoca and eventos[0]["seq"] <= seq + 1:
+            faltantes = [evento for evento in eventos if seq < evento["seq"] <= hasta]
+            # Con varios workers puede haber huecos (eventos entregados fuera de plazo)
+            if len(faltantes) == hasta - seq:
+                return faltantes
+        if not self.mongo:
+            return None
+        eventos = await db.eventos.find(
+            {"epoca": epoca, "sala": sala, "seq": {"$gt": seq, "$lte": hasta}},
+            {"_id": 0}
+        ).sort("seq", ASCENDING).to_list(None)
+        return eventos if len(eventos) == hasta - seq else None
+
+    async def cargar(self):
+        """Crea la colección capped y restaura el último arranque registrado en ella"""
+        if not self.mongo:
+            return
+        try:
+            await db.create_collection("eventos", capped=True, size=EVENTOS_DIARIO_MONGO_BYTES)
+        except CollectionInvalid:
+            pass
+        await db.eventos.create_index([("epoca", ASCENDING), ("sala", ASCENDING), ("seq", ASCENDING)], name="epoca_sala_seq")
+        
+        ultimo = await db.eventos.find_one({}, {"_id": 0, "epoca": 1}, sort=[("$natural", DESCENDING)])
+        if ultimo is None:
+            return
+        recientes = await db.eventos.find({"epoca": ultimo["epoca"]}, {"_id": 0}).sort(
+            "$natural", DESCENDING
+        ).limit(self.max_por_sala * 50).to_list(None)
+        self._salas = {}
+        secuencias: dict = {}
+        for evento in reversed(recientes):
+            self._salas.setdefault(evento["sala"], deque(maxlen=self.max_por_sala)).append(evento)
+            secuencias[evento["sala"]] = max(secuencias.get(evento["sala"], 0), evento["seq"])
+        secuencias_salas.restaurar(ultimo["epoca"], secuencias)
+
+    def metricas(self) -> dict:
+        return {
+            "salas": len(self._salas),
+            "eventos": sum(len(eventos) for eventos in self._salas.values()),
+            "max_por_sala": self.max_por_sala,
+            "mongo": self.mongo,
+            "reposiciones": self.reposiciones,
+            "reposiciones_incompletas": self.reposiciones_incompletas,
+            "errores_mongo": self.errores_mongo
+        }
+
+diario_eventos = DiarioEventos(EVENTOS_DIARIO_MAX, EVENTOS_DIARIO_MONGO)
+
+class DespachadorEventos:
+    """
+    Cola de salida de los eventos de Socket.IO. Los endpoints encolan y responden sin
+    esperar la difusión; una tarea en segundo plano vacía la cola por lotes, en orden,
+    numerando los mensajes de cada sala al sacarlos (un bloque de secuencias por sala).
+    Un cliente con demasiados paquetes pendientes en su transporte deja de recibir en
+    directo: sus mensajes se retienen en una cola propia acotada (al llenarse se
+    descartan los más antiguos; las pantallas públicas retienen pocos) y se le envían
+    cuando se pone al día; el cliente ve el salto en la secuencia y pide lo que falta.
+    Un mensaje que se descarta antes de numerarse (cola llena o fallo al reservar las
+    secuencias) deja reservado su número en la sala: el siguiente evento de esa sala
+    llega con el salto y el cliente vuelve a leer su lista.
+
+    Con una ventana de agrupación, el despachador espera `ventana` segundos tras el
+    primer evento y envía lo acumulado de cada sala como un único `turnos_lote`
+    ({sala, epoca, eventos}), en orden de secuencia; una sala con un solo evento lo
+    recibe tal cual.
+    """
+
+    def __init__(self, max_cola: int, max_lote: int, max_pendientes_cliente: int,
+                 retener_pantalla: int, retener_personal: int, ventana: float = 0):
+        self.ventana = max(0.0, ventana)
+        self.max_cola = max(1, max_cola)
+        self.max_lote = max(1, max_lote)
+        self.max_pendientes_cliente = max(1, max_pendientes_cliente)
+        self.retener_pantalla = max(1, retener_pantalla)
+        self.retener_personal = max(1, retener_personal)
+        self._cola: deque = deque()
+        self._hay_eventos = asyncio.Event()
+        self._retenidos: dict = {}
+        # Números por sala que se saltan en la próxima reserva (mensajes descartados sin numerar)
+        self._saltos: dict = {}
+        self._latencias: deque = deque(maxlen=1000)
+        self.profundidad_max = 0
+        self.emitidos = 0
+        self.descartados_cola = 0
+        self.descartados_cliente = 0
+        self.lotes = 0
+        self.errores = 0
+
+    def encolar(self, evento: str, mensaje: dict, sala: str):
+        if len(self._cola) >= self.max_cola:
+            _, _, descartada, _ = self._cola.popleft()
+            self._saltos[descartada] = self._saltos.get(descartada, 0) + 1
+            self.descartados_cola += 1
+        self._cola.append((evento, mensaje, sala, time.monotonic()))
+        self.profundidad_max = max(self.profundidad_max, len(self._cola))
+        self._hay_eventos.set()
+
+    @staticmethod
+    def _pendientes_transporte(eio_sid: Optional[str]) -> Optional[int]:
+        """Paquetes en cola en el transporte del cliente, o None si ya se desconectó"""
+        socket = sio.eio.sockets.get(eio_sid) if eio_sid else None
+        return socket.queue.qsize() if socket is not None else None
+
+    def _retener(self, sid: str, evento: str, mensaje: dict):
+        retenidos = self._retenidos.get(sid)
+        if retenidos is None:
+            maximo = self.retener_pantalla if SALA_PANTALLA in sio.rooms(sid) else self.retener_personal
+            retenidos = self._retenidos[sid] = deque(maxlen=maximo)
+        if len(retenidos) == retenidos.maxlen:
+            self.descartados_cliente += 1
+        retenidos.append((evento, mensaje))
+
+    async def _enviar(self, evento: str, mensaje: dict, sala: str):
+        lentos = []
+        for sid, eio_sid in sio.manager.get_participants("/", sala):
+            pendientes = self._pendientes_transporte(eio_sid)
+            if sid in self._retenidos or (pendientes or 0) >= self.max_pendientes_cliente:
+                self._retener(sid, evento, mensaje)
+                lentos.append(sid)
+        # Los demás reciben un único paquete codificado para toda la sala
+        await sio.emit(evento, mensaje, to=sala, skip_sid=lentos or None)
+
+    async def _liberar_retenidos(self):
+        for sid in list(self._retenidos):
+            pendientes = self._pendientes_transporte(sio.manager.eio_sid_from_sid(sid, "/"))
+            if pendientes is not None and pendientes >= self.max_pendientes_cliente:
+                continue
+            retenidos = self._retenidos.pop(sid)
+            if pendientes is None:
+                continue
+            for evento, mensaje in retenidos:
+                await sio.emit(evento, mensaje, to=sid)
+
+    async def _numerar(self, lote: list) -> list:
+        """
+        Asigna época y secuencia a los mensajes del lote y los registra en el diario.
+        Devuelve los que quedaron numerados; los de una sala cuya reserva falla se
+        descartan y sus números se saltan en la siguiente reserva de la sala.
+        """
+        por_sala: dict = {}
+        for _, mensaje, sala, _ in lote:
+            por_sala.setdefault(sala, []).append(mensaje)
+        fallidas = set()
+        for sala, mensajes in por_sala.items():
+            saltos = self._saltos.pop(sala, 0)
+            try:
+                primera = await secuencias_salas.reservar(sala, saltos + len(mensajes)) + saltos
+            except Exception:
+                self._saltos[sala] = saltos + len(mensajes)
+                self.errores += 1
+                fallidas.add(sala)
+                logger.exception("Error al numerar %s eventos de la sala %s; no se emiten", len(mensajes), sala)
+                continue
+            for seq, mensaje in enumerate(mensajes, primera):
+                mensaje["epoca"] = secuencias_salas.epoca
+                mensaje["seq"] = seq
+                diario_eventos.persistir(mensaje)
+                if not secuencias_salas.compartidas:
+                    # Con varios workers se registra al entregarse, ya en orden (OrdenEventos)
+                    evento_entregado(mensaje)
+        return [item for item in lote if item[2] not in fallidas] if fallidas else lote
+
+    def _agrupar(self, lote: list) -> list:
+        """Une los eventos del lote por sala en un `turnos_lote`, conservando su orden"""
+        por_sala: dict = {}
+        for evento, mensaje, sala, _ in lote:
+            por_sala.setdefault(sala, []).append((evento, mensaje))
+        envios = []
+        for sala, eventos in por_sala.items():
+            if len(eventos) == 1:
+                envios.append((*eventos[0], sala))
+                continue
+            mensajes = [mensaje for _, mensaje in eventos]
+            envios.append(("turnos_lote", {"sala": sala, "epoca": mensajes[0]["epoca"], "eventos": mensajes}, sala))
+            self.lotes += 1
+        return envios
+
+    async def ejecutar(self, intervalo_retenidos: float = 0.05):
+        while True:
+            if self._retenidos and not self._cola:
+                # Hay clientes lentos: se revisa con frecuencia si ya se pusieron al día
+                await asyncio.sleep(intervalo_retenidos)
+            else:
+                await self._hay_eventos.wait()
+                if self.ventana:
+                    # Se deja que la ráfaga se acumule para enviarla en un solo paquete por sala
+                    await asyncio.sleep(self.ventana)
+            self._hay_eventos.clear()
+            while self._cola:
+                extraidos = [self._cola.popleft() for _ in range(min(self.max_lote, len(self._cola)))]
+                try:
+                    lote = await self._numerar(extraidos)
+                except Exception:
+                    # Los números ya reservados quedan sin entregar: el cliente verá el salto
+                    self.errores += 1
+                    logger.exception("Error al numerar %s eventos de turno; no se emiten", len(extraidos))
+                    continue
+                envios = self._agrupar(lote) if self.ventana else [item[:3] for item in lote]
+                for evento, mensaje, sala in envios:
+                    try:
+                        await self._enviar(evento, mensaje, sala)
+                    except Exception:
+                        logger.exception("Error al emitir %s a la sala %s", evento, sala)
+                ahora = time.monotonic()
+                self._latencias.extend(ahora - encolado for *_, encolado in lote)
+                self.emitidos += len(lote)
+            if self._retenidos:
+                await self._liberar_retenidos()
+
+    def metricas(self) -> dict:
+        latencias = sorted(self._latencias)
+        def percentil(p: float) -> float:
+            return round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 2) if latencias else 0.0
+        return {
+            "profundidad": len(self._cola),
+            "profundidad_max": self.profundidad_max,
+            "emitidos": self.emitidos,
+            "descartados_cola": self.descartados_cola,
+            "saltos_pendientes": sum(self._saltos.values()),
+            "clientes_lentos": len(self._retenidos),
+            "mensajes_retenidos": sum(len(retenidos) for retenidos in self._retenidos.values()),
+            "descartados_cliente": self.descartados_cliente,
+            "ventana_ms": self.ventana * 1000,
+            "lotes": self.lotes,
+            "errores": self.errores,
+            "latencia_p50_ms": percentil(0.5),
+            "latencia_p99_ms": percentil(0.99)
+        }
+
+despachador_eventos = DespachadorEventos(
+    EVENTOS_COLA_MAX, EVENTOS_LOTE_MAX, EVENTOS_PENDIENTES_CLIENTE,
+    EVENTOS_RETENIDOS_PANTALLA, EVENTOS_RETENIDOS_PERSONAL, EVENTOS_VENTANA_MS / 1000
+)
+
+class DifusionPantalla:
+    """
+    Stream SSE de la pantalla pública. Cada evento de la sala pantalla se codifica una sola
+    vez como trama SSE en un buffer circular compartido; cada conexión solo guarda la
+    secuencia de la última trama que escribió. Si una conexión se atrasa más de
+    `max_pendientes` tramas, o las que le faltan ya no están seguidas en el buffer, recibe
+    de nuevo la instantánea de llamados en lugar del atraso: lo que se le escribe de una
+    vez queda acotado sin importar qué tan lento lea.
+    """
+
+    def __init__(self, capacidad: int, max_pendientes: int, latido: float):
+        self.max_pendientes = max(1, max_pendientes)
+        self.latido = latido
+        self._tramas: deque = deque(maxlen=max(capacidad, self.max_pendientes))
+        self._aviso = asyncio.Event()
+        self.suscriptores = 0
+        self.publicadas = 0
+        self.instantaneas = 0
+        self.bytes_enviados = 0
+
+    @staticmethod
+    def _trama(evento: str, identificador: str, datos) -> bytes:
+        return b"".join((
+            b"id: ", identificador.encode(), b"\nevent: ", evento.encode(),
+            b"\ndata: ", codificar_json(datos), b"\n\n"
+        ))
+
+    def publicar(self, mensaje: dict):
+        identificador = f'{mensaje["epoca"]}:{mensaje["seq"]}'
+        self._tramas.append((mensaje["seq"], self._trama(mensaje["evento"], identificador, mensaje)))
+        self.publicadas += 1
+        # Despierta a todas las conexiones a la vez; las siguientes esperas usan un aviso nuevo
+        self._aviso.set()
+        self._aviso = asyncio.Event()
+
+    def _pendientes(self, ultima: int) -> Optional[list]:
+        """Tramas posteriores a `ultima`, o None si hay que reenviar la instantánea"""
+        if not self._tramas or self._tramas[-1][0] <= ultima:
+            return []
+        inicio = ultima + 1 - self._tramas[0][0]
+        cantidad = len(self._tramas) - inicio
+        if inicio < 0 or cantidad > self.max_pendientes or self._tramas[-1][0] - ultima != cantidad:
+            return None
+        return list(islice(self._tramas, inicio, None))
+
+    async def _esperar(self, aviso: asyncio.Event) -> bool:
+        """Espera una trama nueva hasta `latido` segundos; False si venció el plazo"""
+        espera = asyncio.ensure_future(aviso.wait())
+        try:
+            hechas, _ = await asyncio.wait({espera}, timeout=self.latido)
+        finally:
+            espera.cancel()
+        return bool(hechas)
+
+    async def suscribir(self, ultimo_id: Optional[str]):
+        """Tramas de una conexión; `ultimo_id` es el Last-Event-ID ("epoca:seq") al reconectar"""
+        self.suscriptores += 1
+        try:
+            yield b"retry: 3000\n\n"
+            epoca, _, seq = (ultimo_id or "").partition(":")
+            ultima = int(seq) if epoca == secuencias_salas.epoca and seq.isdigit() else None
+            while True:
+                aviso = self._aviso
+                pendientes = self._pendientes(ultima) if ultima is not None else None
+                if pendientes is None:
+                    # La secuencia se toma antes de leer: lo posterior llega como tramas
+                    ultima = secuencias_salas.actual(SALA_PANTALLA)
+                    llamados = formar_documentos(await buffer_llamados.recientes(), TurnoPantalla)
+                    datos = self._trama("llamados", f"{secuencias_salas.epoca}:{ultima}", llamados)
+                    self.instantaneas += 1
+                elif pendientes:
+                    ultima = pendientes[-1][0]
+                    datos = b"".join(trama for _, trama in pendientes)
+                else:
+                    datos = None
+                if datos:
+                    self.bytes_enviados += len(datos)
+                    yield datos
+                if not await self._esperar(aviso):
+                    yield b": latido\n\n"
+        finally:
+            self.suscriptores -= 1
+
+    def metricas(self) -> dict:
+        return {
+            "suscriptores": self.suscriptores,
+            "tramas": len(self._tramas),
+            "publicadas": self.publicadas,
+            "instantaneas": self.instantaneas,
+            "bytes_enviados": self.bytes_enviados
+        }
+
+difusion_pantalla = DifusionPantalla(SSE_BUFFER_EVENTOS, SSE_PENDIENTES_MAX, SSE_LATIDO_SEGUNDOS)
+
+def evento_entregado(evento: dict):
+    """Un evento ya numerado y en orden: pasa al diario y, si es de la pantalla, al stream SSE"""
+    if diario_eventos.registrar(evento) and evento["sala"] == SALA_PANTALLA:
+        difusion_pantalla.publicar(evento)
+
+def delta_turno(evento: str, turno: dict) -> dict:
+    """
+    Cambio mínimo que produce un evento: los campos de la fila de la cola (identidad,
+    estado y orden) más los que modificó la transición.
+    """
+    if evento == "turno_generado":
+        cambios = {campo: valor for campo, valor in turno.items() if campo != "_id"}
+    else:
+        cambios = {campo: turno.get(campo) for campo in CAMPOS_COLA + CAMPOS_EVENTO.get(evento, [])}
+    return {"evento": evento, "id": turno["id"], "estado": turno["estado"], "cambios": cambios}
+
+def delta_para_sala(delta: dict, sala: str) -> dict:
+    """Mensaje de una sala: el delta recortado al perfil de la sala, si tiene uno"""
+    campos = PERFILES_SALA.get(sala)
+    if campos is None:
+        return {**delta, "sala": sala}
+    cambios = {campo: delta["cambios"][campo] for campo in campos if campo in delta["cambios"]}
+    return {**delta, "cambios": cambios, "sala": sala}
+
+def emitir_turno(evento: str, turno: dict):
+    """
+    Encola el delta de un evento de turno para cada sala interesada, recortado al perfil
+    de la sala (PERFILES_SALA); el despachador le
+    asigna la secuencia de la sala y lo emite sin retrasar la respuesta HTTP.
+    Contrato del reductor del cliente: frontend/src/lib/eventosTurnos.js
+    """
+    delta = delta_turno(evento, turno)
+    for sala in salas_turno(evento, turno):
+        despachador_eventos.encolar(evento, delta_para_sala(delta, sala), sala)
+
+@sio.on('reanudar')
+async def reanudar_eventos(sid, data=None):
+    """
+    Reposición tras una reconexión o un salto de secuencia. El cliente envía
+    {epoca, ultimas: {sala: seq}} y recibe (ack) las secuencias actuales de sus salas y,
+    si el diario cubre todo lo que perdió, los eventos faltantes; si no, completo=False y
+    el cliente vuelve a leer sus listas (las secuencias sirven de base desde ese momento).
+    """
+    datos = data if isinstance(data, dict) else {}
+    ultimas = datos.get("ultimas") or {}
+    epoca = secuencias_salas.epoca
+    # Las secuencias se toman antes de cualquier espera: lo posterior llega en vivo
+    secuencias = {
+        sala: secuencias_salas.actual(sala)
+        for sala in sio.rooms(sid)
+        if sala != sid and not sala.startswith("usuario:")
+    }
+    
+    completo = datos.get("epoca") == epoca
+    eventos = []
+    for sala, actual in secuencias.items():
+        if not completo:
+            break
+        seq = ultimas.get(sala)
+        faltantes = await diario_eventos.desde(epoca, sala, seq, actual) if isinstance(seq, int) else None
+        if faltantes is None:
+            completo = False
+        else:
+            eventos.extend(faltantes)
+    
+    if completo:
+        diario_eventos.reposiciones += 1
+    else:
+        diario_eventos.reposiciones_incompletas += 1
+    return {"epoca": epoca, "secuencias": secuencias, "completo": completo, "eventos": eventos if completo else []}
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    """
+    Une el socket a sus salas. Con un token válido en `auth`, las de su rol y la del
+    usuario (para reasignarlas si cambian sus servicios); sin token, la pantalla pública.
+    """
+    token = auth.get("token") if isinstance(auth, dict) else None
+    usuario = None
+    if token:
+        try:
+            usuario = await obtener_usuario_actual(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+        except HTTPException:
+            logger.info("Socket %s con token inválido; se conecta como pantalla pública", sid)
+    
+    if usuario is None:
+        await sio.enter_room(sid, SALA_PANTALLA)
+        return
+    await sio.enter_room(sid, sala_usuario(usuario.id))
+    for sala in salas_usuario(usuario):
+        await sio.enter_room(sid, sala)
+
+async def reasignar_salas(usuario: Usuario):
+    """Actualiza las salas de los sockets abiertos de un usuario tras cambiar su rol o servicios"""
+    sala_propia = sala_usuario(usuario.id)
+    for sid, _ in sio.manager.get_participants("/", sala_propia):
+        for sala in sio.rooms(sid):
+            if sala not in (sid, sala_propia):
+                await sio.leave_room(sid, sala)
+        for sala in salas_usuario(usuario):
+            await sio.enter_room(sid, sala)
+
+async def desconectar_usuario(usuario_id: str):
+    for sid, _ in sio.manager.get_participants("/", sala_usuario(usuario_id)):
+        await sio.disconnect(sid)
+
+async def avisar_procesos(aviso: dict):
+    """Comunica a los demás workers un cambio del estado en memoria (sin efecto con un solo proceso)"""
+    if not isinstance(sio.manager, BusProcesos):
+        return
+    try:
+        await sio.manager.avisar(aviso)
+    except Exception:
+        # El worker que no reciba el aviso se corrige en la siguiente reconciliación
+        # (cola y llamados con su recarga; versiones de token con reconciliar_avisos)
+        logger.exception("No se pudo publicar el aviso %s a los demás workers", aviso["tipo"])
+
+async def aplicar_aviso(aviso: dict):
+    """Aplica en este worker un cambio de estado publicado por otro con avisar_procesos"""
+    global prioridades_configuradas
+    tipo = aviso["tipo"]
+    if tipo == "turno":
+        motor_cola.aplicar(aviso["turno"])
+        buffer_llamados.aplicar(aviso["turno"])
+    elif tipo == "recurso":
+        versiones_recursos.incrementar(aviso["recurso"])
+    elif tipo == "usuario":
+        cache_usuarios.invalidar(aviso["id"])
+        versiones_token[aviso["id"]] = aviso["version"]
+        if aviso["usuario"] is None:
+            await desconectar_usuario(aviso["id"])
+        else:
+            await reasignar_salas(Usuario(**aviso["usuario"]))
+    elif tipo == "prioridades":
+        prioridades_configuradas = aviso["prioridades"]
+        await motor_cola.cargar()
+
+async def reconciliar_avisos():
+    """
+    Relee de MongoDB el estado que llega a los demás workers por avisos (versiones de token
+    y prioridades) por si alguno se perdió en el bus. Una versión solo avanza: una lectura
+    anterior a un cambio hecho en este worker no lo deshace.
+    """
+    global prioridades_configuradas
+    conocidos = list(versiones_token)
+    if conocidos:
+        usuarios = await db.usuarios.find(
+            {"id": {"$in": conocidos}}, {"_id": 0, "id": 1, "token_version": 1}
+        ).to_list(None)
+        actuales = {u["id"]: u.get("token_version", 0) for u in usuarios}
+        for usuario_id in conocidos:
+            conocida = versiones_token.get(usuario_id)
+            actual = actuales.get(usuario_id)
+            if actual is None or (conocida is not None and actual > conocida):
+                versiones_token[usuario_id] = actual
+    config = await db.configuracion.find_one({}, {"_id": 0, "prioridades": 1})
+    prioridades_configuradas = (config or {}).get("prioridades", PRIORIDADES_POR_DEFECTO)
+
+async def reflejar_turno(turno: dict):
+    """Lleva el estado más reciente de un turno a la cola y a los llamados en memoria de todos los workers"""
+    motor_cola.aplicar(turno)
+    buffer_llamados.aplicar(turno)
+    await avisar_procesos({"tipo": "turno", "turno": turno})
+
 @api_router.post("/auth/login", response_model=Token)
 async def login(request: LoginRequest):
     usuario = await db.usuarios.find_one({"email": request.email}, {"_id": 0})
-    if not usuario or not verificar_password(request.password, usuario["password_hash"]):
+    if not usuario or not await verificar_password(request.password, usuario["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos"
@@ -214,7 +1505,7 @@ async def login(request: LoginRequest):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = crear_access_token(
-        data={"sub": usuario["email"]}, expires_delta=access_token_expires
+        data=claims_usuario(usuario), expires_delta=access_token_expires
     )
     
     usuario_response = Usuario(**usuario)
@@ -232,7 +1523,7 @@ async def obtener_perfil(usuario: Usuario = Depends(obtener_usuario_actual)):
 @api_router.get("/usuarios", response_model=List[Usuario])
 async def listar_usuarios(usuario: Usuario = Depends(requerir_rol(["administrador"]))):
     usuarios = await db.usuarios.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    return [Usuario(**u) for u in usuarios]
+    return respuesta_lista(usuarios, Usuario)
 
 @api_router.post("/usuarios", response_model=Usuario)
 async def crear_usuario(datos: UsuarioCreate, usuario: Usuario = Depends(requerir_rol(["administrador"]))):
@@ -242,7 +1533,7 @@ async def crear_usuario(datos: UsuarioCreate, usuario: Usuario = Depends(requeri
     
     import uuid
     usuario_id = str(uuid.uuid4())
-    password_hash = obtener_password_hash(datos.password)
+    password_hash = await obtener_password_hash(datos.password)
     
     usuario_doc = {
         "id": usuario_id,
@@ -256,10 +1547,13 @@ async def crear_usuario(datos: UsuarioCreate, usuario: Usuario = Depends(requeri
         "fecha_creacion": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.usuarios.insert_one(usuario_doc)
+    try:
+        await db.usuarios.insert_one(usuario_doc)
+    except DuplicateKeyError:
+        # Dos altas simultáneas con el mismo email: el índice único rechaza la segunda
+        raise HTTPException(status_code=400, detail="El email ya está registrado")
     
-    usuario_response = await db.usuarios.find_one({"id": usuario_id}, {"_id": 0, "password_hash": 0})
-    return Usuario(**usuario_response)
+    return Usuario(**usuario_doc)
 
 @api_router.put("/usuarios/{usuario_id}", response_model=Usuario)
 async def actualizar_usuario(
@@ -270,7 +1564,7 @@ async def actualizar_usuario(
     update_data = {k: v for k, v in datos.model_dump().items() if v is not None}
     
     if "password" in update_data:
-        update_data["password_hash"] = obtener_password_hash(update_data.pop("password"))
+        update_data["password_hash"] = await obtener_password_hash(update_data.pop("password"))
     
     if "email" in update_data:
         usuario_con_email = await db.usuarios.find_one({"email": update_data["email"], "id": {"$ne": usuario_id}})
@@ -280,25 +1574,67 @@ async def actualizar_usuario(
     if not update_data:
         raise HTTPException(status_code=400, detail="No hay datos para actualizar")
     
-    result = await db.usuarios.update_one({"id": usuario_id}, {"$set": update_data})
+    # Incrementar la versión invalida los tokens con claims emitidos antes del cambio
+    try:
+        usuario_actualizado = await db.usuarios.find_one_and_update(
+            {"id": usuario_id},
+            {"$set": update_data, "$inc": {"token_version": 1}},
+            projection={"_id": 0, "password_hash": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="El email ya está registrado")
+    cache_usuarios.invalidar(usuario_id)
     
-    if result.matched_count == 0:
+    if usuario_actualizado is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    usuario_actualizado = await db.usuarios.find_one({"id": usuario_id}, {"_id": 0, "password_hash": 0})
-    return Usuario(**usuario_actualizado)
+    versiones_token[usuario_id] = usuario_actualizado.get("token_version", 0)
+    usuario_modelo = Usuario(**usuario_actualizado)
+    await reasignar_salas(usuario_modelo)
+    await avisar_procesos({
+        "tipo": "usuario",
+        "id": usuario_id,
+        "version": versiones_token[usuario_id],
+        "usuario": usuario_modelo.model_dump()
+    })
+    return usuario_modelo
 
 @api_router.delete("/usuarios/{usuario_id}")
 async def eliminar_usuario(usuario_id: str, usuario: Usuario = Depends(requerir_rol(["administrador"]))):
     result = await db.usuarios.delete_one({"id": usuario_id})
+    cache_usuarios.invalidar(usuario_id)
+    versiones_token[usuario_id] = None
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    await desconectar_usuario(usuario_id)
+    await avisar_procesos({"tipo": "usuario", "id": usuario_id, "version": None, "usuario": None})
     return {"message": "Usuario eliminado exitosamente"}
 
+@api_router.get("/metricas")
+async def obtener_metricas(usuario: Usuario = Depends(requerir_rol(["administrador"]))):
+    """Métricas internas de rendimiento (caché de usuarios, etc.)"""
+    return {
+        "cache_usuarios": cache_usuarios.metricas(),
+        "cache_tokens": cache_tokens.metricas(),
+        "pool_passwords": pool_passwords.metricas(),
+        "motor_cola": motor_cola.metricas(),
+        "buffer_llamados": buffer_llamados.metricas(),
+        "diario_eventos": diario_eventos.metricas(),
+        "despachador_eventos": despachador_eventos.metricas(),
+        "difusion_pantalla": difusion_pantalla.metricas(),
+        "bus_socketio": sio.manager.metricas() if isinstance(sio.manager, BusProcesos) else {"gestor": "local"},
+        "versiones_recursos": versiones_recursos.metricas()
+    }
+
 @api_router.get("/servicios", response_model=List[Servicio])
-async def listar_servicios(usuario: Usuario = Depends(obtener_usuario_actual)):
+async def listar_servicios(request: Request, usuario: Usuario = Depends(obtener_usuario_actual)):
+    etag, version = versiones_recursos.vigente("servicios")
+    no_modificado = versiones_recursos.no_modificado(request, etag)
+    if no_modificado is not None:
+        return no_modificado
     servicios = await db.servicios.find({}, {"_id": 0}).to_list(1000)
-    return [Servicio(**s) for s in servicios]
+    return versiones_recursos.publicar(request, respuesta_lista(servicios, Servicio), "servicios", version)
 
 @api_router.post("/servicios", response_model=Servicio)
 async def crear_servicio(datos: ServicioCreate, usuario: Usuario = Depends(requerir_rol(["administrador"]))):
@@ -314,8 +1650,9 @@ async def crear_servicio(datos: ServicioCreate, usuario: Usuario = Depends(reque
     }
     
     await db.servicios.insert_one(servicio_doc)
-    servicio_response = await db.servicios.find_one({"id": servicio_id}, {"_id": 0})
-    return Servicio(**servicio_response)
+    versiones_recursos.incrementar("servicios")
+    await avisar_procesos({"tipo": "recurso", "recurso": "servicios"})
+    return Servicio(**servicio_doc)
 
 @api_router.put("/servicios/{servicio_id}", response_model=Servicio)
 async def actualizar_servicio(
@@ -331,12 +1668,18 @@ async def actualizar_servicio(
     if not update_data:
         raise HTTPException(status_code=400, detail="No hay datos para actualizar")
     
-    result = await db.servicios.update_one({"id": servicio_id}, {"$set": update_data})
+    servicio_actualizado = await db.servicios.find_one_and_update(
+        {"id": servicio_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
     
-    if result.matched_count == 0:
+    if servicio_actualizado is None:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
+    versiones_recursos.incrementar("servicios")
+    await avisar_procesos({"tipo": "recurso", "recurso": "servicios"})
     
-    servicio_actualizado = await db.servicios.find_one({"id": servicio_id}, {"_id": 0})
     return Servicio(**servicio_actualizado)
 
 @api_router.delete("/servicios/{servicio_id}")
@@ -344,8 +1687,315 @@ async def eliminar_servicio(servicio_id: str, usuario: Usuario = Depends(requeri
     result = await db.servicios.delete_one({"id": servicio_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
+    versiones_recursos.incrementar("servicios")
+    await avisar_procesos({"tipo": "recurso", "recurso": "servicios"})
     return {"message": "Servicio eliminado exitosamente"}
 
+# Rango para turnos sin prioridad: siempre después de cualquier prioridad configurada
+RANGO_SIN_PRIORIDAD = 1000
+PRIORIDADES_POR_DEFECTO = ["Discapacidad", "Embarazo", "Adulto Mayor"]
+
+# Copia en proceso de Configuracion.prioridades; se recarga al actualizar la configuración
+prioridades_configuradas: Optional[List[str]] = None
+
+async def obtener_prioridades() -> List[str]:
+    global prioridades_configuradas
+    if prioridades_configuradas is None:
+        config = await db.configuracion.find_one({}, {"_id": 0, "prioridades": 1})
+        prioridades_configuradas = (config or {}).get("prioridades", PRIORIDADES_POR_DEFECTO)
+    return prioridades_configuradas
+
+def rango_prioridad(prioridad: Optional[str], prioridades: List[str]) -> int:
+    """Rango numérico de la prioridad según el orden de Configuracion.prioridades (menor = antes)"""
+    if not prioridad:
+        return RANGO_SIN_PRIORIDAD
+    if prioridad in prioridades:
+        return prioridades.index(prioridad)
+    return len(prioridades)
+
+def expresion_rango_prioridad(prioridades: List[str]) -> dict:
+    """Equivalente de rango_prioridad como expresión de agregación, para recalcular en la BD"""
+    ramas = [{"case": {"$in": [{"$ifNull": ["$prioridad", ""]}, [""]]}, "then": RANGO_SIN_PRIORIDAD}]
+    ramas += [{"case": {"$eq": ["$prioridad", {"$literal": p}]}, "then": i} for i, p in enumerate(prioridades)]
+    return {"$switch": {"branches": ramas, "default": len(prioridades)}}
+
+async def recalcular_rangos_prioridad(filtro: dict, prioridades: List[str]):
+    await db.turnos.update_many(filtro, [{"$set": {"prioridad_rango": expresion_rango_prioridad(prioridades)}}])
+
+ORDEN_COLA = [("prioridad_rango", 1), ("fecha_creacion", 1)]
+
+# Campos de un turno que guarda la cola en memoria (resumen + clave de orden)
+CAMPOS_COLA = list(TurnoResumen.model_fields)
+PROYECCION_COLA = {"_id": 0, **{campo: 1 for campo in CAMPOS_COLA}}
+
+async def reconciliar_periodicamente(recargar, intervalo: float, descripcion: str):
+    """Repite `recargar` cada `intervalo` segundos; un error se registra y se reintenta en la siguiente vuelta"""
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await recargar()
+        except Exception:
+            logger.exception("Error al reconciliar %s", descripcion)
+
+class EstadoTurnosMemoria(ABC):
+    """
+    Base de las vistas en memoria de los turnos. cargar() las reconstruye desde MongoDB;
+    las transiciones que llegan con aplicar() mientras dura la lectura se guardan y se
+    vuelven a aplicar sobre lo leído, para que la recarga no las pierda. Las recargas de
+    una misma vista van de a una: si se solaparan, la que termina después instalaría una
+    lectura anterior a transiciones que ya solo conocía la otra.
+    """
+
+    def __init__(self):
+        self._cerrojo = asyncio.Lock()
+        self._pendientes: Optional[list] = None
+
+    @abstractmethod
+    async def _leer(self) -> list:
+        """Turnos de la vista según MongoDB"""
+
+    @abstractmethod
+    def _reconstruir(self, turnos: list):
+        """Reemplaza el estado por el que resulta de aplicar `turnos` en orden"""
+
+    def _anotar(self, turno: dict):
+        if self._pendientes is not None:
+            self._pendientes.append(turno)
+
+    async def cargar(self, necesaria: Optional[Callable[[], bool]] = None):
+        """
+        Reconstruye la vista desde MongoDB sin perder las mutaciones hechas durante la lectura.
+        Espera a que termine la recarga en curso; con `necesaria`, la omite si al llegar su
+        turno ya no hace falta.
+        """
+        async with self._cerrojo:
+            if necesaria is not None and not necesaria():
+                return
+            pendientes = self._pendientes = []
+            try:
+                leidos = await self._leer()
+                self._reconstruir(leidos + pendientes)
+            finally:
+                self._pendientes = None
+
+class MotorCola(EstadoTurnosMemoria):
+    """
+    Cola en memoria de los turnos abiertos (estado creado), ordenada por servicio
+    según ORDEN_COLA. Se carga desde MongoDB al iniciar, los endpoints de mutación
+    la mantienen al día con aplicar() y una reconciliación periódica corrige
+    cualquier desviación (p. ej. cambios hechos por otro proceso).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._turnos: dict = {}
+        self._colas: dict = {}
+        self.cargado = False
+        self.reconciliaciones = 0
+        self.ultima_reconciliacion: Optional[str] = None
+
+    @staticmethod
+    def _clave(turno: dict) -> tuple:
+        return (turno["prioridad_rango"], turno["fecha_creacion"], turno["id"])
+
+    def _quitar(self, turnos: dict, colas: dict, turno_id: str):
+        anterior = turnos.pop(turno_id, None)
+        if anterior is None:
+            return
+        cola = colas.get(anterior["servicio_id"], [])
+        posicion = bisect.bisect_left(cola, self._clave(anterior))
+        if posicion < len(cola) and cola[posicion][2] == turno_id:
+            cola.pop(posicion)
+
+    def _aplicar(self, turnos: dict, colas: dict, turno: dict):
+        self._quitar(turnos, colas, turno["id"])
+        if turno.get("estado") != "creado":
+            return
+        guardado = {campo: turno.get(campo) for campo in CAMPOS_COLA}
+        # La clave con la que se inserta es la misma con la que luego se busca para quitarlo
+        if guardado["prioridad_rango"] is None:
+            guardado["prioridad_rango"] = RANGO_SIN_PRIORIDAD
+        turnos[turno["id"]] = guardado
+        bisect.insort(colas.setdefault(turno["servicio_id"], []), self._clave(guardado))
+
+    def aplicar(self, turno: dict):
+        """Refleja el estado más reciente de un turno: entra a la cola si está creado, si no sale"""
+        self._aplicar(self._turnos, self._colas, turno)
+        self._anotar(turno)
+
+    def pagina(
+        self,
+        servicios_ids: Optional[List[str]] = None,
+        despues: Optional[tuple] = None,
+        limite: Optional[int] = None
+    ) -> tuple:
+        """
+        Turnos en orden de atención de los servicios indicados (todos si es None),
+        a partir de la clave `despues`. Devuelve (turnos, clave del último si hay más).
+        """
+        ids = self._colas.keys() if servicios_ids is None else servicios_ids
+        colas = []
+        for servicio_id in ids:
+            cola = self._colas.get(servicio_id)
+            if cola:
+                inicio = bisect.bisect_right(cola, despues) if despues is not None else 0
+                colas.append(islice(cola, inicio, None))
+        claves = heapq.merge(*colas)
+        
+        if limite is None:
+            return [self._turnos[clave[2]] for clave in claves], None
+        claves = list(islice(claves, limite + 1))
+        siguiente = claves[limite - 1] if len(claves) > limite else None
+        return [self._turnos[clave[2]] for clave in claves[:limite]], siguiente
+
+    def longitudes(self) -> dict:
+        return {servicio_id: len(cola) for servicio_id, cola in self._colas.items() if cola}
+
+    async def _leer(self) -> list:
+        return await db.turnos.find({"estado": "creado"}, PROYECCION_COLA).to_list(None)
+
+    def _reconstruir(self, turnos: list):
+        abiertos, colas = {}, {}
+        for turno in turnos:
+            self._aplicar(abiertos, colas, turno)
+        self._turnos, self._colas = abiertos, colas
+        self.cargado = True
+        self.reconciliaciones += 1
+        self.ultima_reconciliacion = datetime.now(timezone.utc).isoformat()
+
+    def metricas(self) -> dict:
+        return {
+            "turnos_abiertos": len(self._turnos),
+            "servicios": len(self.longitudes()),
+            "reconciliaciones": self.reconciliaciones,
+            "ultima_reconciliacion": self.ultima_reconciliacion
+        }
+
+motor_cola = MotorCola()
+
+ESTADOS_LLAMADOS = ["llamado", "atendiendo", "finalizado"]
+LLAMADOS_RECIENTES = 10
+
+class BufferLlamados(EstadoTurnosMemoria):
+    """
+    Últimos turnos llamados (llamado, atendiendo o finalizado), del más reciente al más
+    antiguo por fecha_llamado, para servir la pantalla pública desde memoria. Los
+    endpoints de transición lo mantienen con aplicar(); guarda más turnos de los que se
+    muestran para que una salida (p. ej. un turno redirigido) no deje la lista corta.
+    """
+
+    def __init__(self, capacidad: int):
+        super().__init__()
+        self.capacidad = max(capacidad, LLAMADOS_RECIENTES)
+        self._turnos: list = []
+        self._incompleto = True
+        self.recargas = 0
+
+    def _aplicar(self, turnos: list, turno: dict) -> bool:
+        posicion = next((i for i, t in enumerate(turnos) if t["id"] == turno["id"]), None)
+        entra = turno.get("estado") in ESTADOS_LLAMADOS and turno.get("fecha_llamado")
+        if posicion is None and not entra:
+            return False
+        if posicion is not None:
+            turnos.pop(posicion)
+        if entra:
+            posicion = next(
+                (i for i, t in enumerate(turnos) if t["fecha_llamado"] < turno["fecha_llamado"]),
+                len(turnos)
+            )
+            turnos.insert(posicion, turno)
+            del turnos[self.capacidad:]
+        return True
+
+    def aplicar(self, turno: dict):
+        """Refleja el estado más reciente de un turno e invalida el ETag si la lista cambió"""
+        if self._aplicar(self._turnos, turno):
+            versiones_recursos.incrementar("llamados")
+            # Si salió un turno y la BD puede tener más, se completa en la siguiente lectura
+            if len(self._turnos) < LLAMADOS_RECIENTES and self.recargas:
+                self._incompleto = True
+        self._anotar(turno)
+
+    async def recientes(self, limite: int = LLAMADOS_RECIENTES) -> List[dict]:
+        if self._incompleto:
+            # Las lecturas que esperan a la misma recarga no vuelven a consultar la BD
+            await self.cargar(lambda: self._incompleto)
+        return self._turnos[:limite]
+
+    async def _leer(self) -> list:
+        return await db.turnos.find(
+            {"estado": {"$in": ESTADOS_LLAMADOS}},
+            {"_id": 0}
+        ).sort("fecha_llamado", -1).limit(self.capacidad).to_list(self.capacidad)
+
+    def _reconstruir(self, turnos: list):
+        llamados: list = []
+        for turno in turnos:
+            self._aplicar(llamados, turno)
+        self._turnos = llamados
+        self._incompleto = False
+        self.recargas += 1
+        versiones_recursos.incrementar("llamados")
+
+    def metricas(self) -> dict:
+        return {
+            "turnos": len(self._turnos),
+            "capacidad": self.capacidad,
+            "recargas": self.recargas
+        }
+
+buffer_llamados = BufferLlamados(LLAMADOS_BUFFER)
+
+def inicio_dia_local(momento: Optional[datetime] = None) -> datetime:
+    """Inicio del día en la zona horaria de la sede, expresado en UTC"""
+    local = (momento or datetime.now(timezone.utc)).astimezone(ZONA_HORARIA)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0).astimezone(timezone.utc)
+
+# Contadores ya alineados con los turnos existentes en este proceso
+contadores_sembrados: set = set()
+
+async def sembrar_contador(clave: str, servicio_id: str, desde: Optional[datetime]):
+    """Alinea un contador nuevo con el último código emitido antes de existir la colección"""
+    filtro = {"servicio_id": servicio_id}
+    if desde is not None:
+        filtro["fecha_creacion"] = {"$gte": desde.isoformat()}
+    ultimo_turno = await db.turnos.find_one(filtro, {"_id": 0, "codigo": 1}, sort=[("fecha_creacion", -1)])
+    
+    numero = 0
+    if ultimo_turno and ultimo_turno.get("codigo"):
+        try:
+            numero = int(ultimo_turno["codigo"].rsplit("-", 1)[1])
+        except (IndexError, ValueError):
+            numero = 0
+    
+    # $max es idempotente: si otro proceso ya sembró o avanzó el contador no lo retrocede
+    await db.contadores.update_one(
+        {"_id": clave},
+        {"$max": {"valor": numero}, "$setOnInsert": {"servicio_id": servicio_id}},
+        upsert=True
+    )
+
+async def siguiente_numero_turno(servicio_id: str) -> int:
+    """Asigna el siguiente número del servicio con un único $inc atómico"""
+    if REINICIO_DIARIO_CODIGOS:
+        desde = inicio_dia_local()
+        clave = f"{servicio_id}:{desde.astimezone(ZONA_HORARIA).date().isoformat()}"
+    else:
+        desde = None
+        clave = servicio_id
+    
+    if clave not in contadores_sembrados:
+        await sembrar_contador(clave, servicio_id, desde)
+        contadores_sembrados.add(clave)
+    
+    contador = await db.contadores.find_one_and_update(
+        {"_id": clave},
+        {"$inc": {"valor": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return contador["valor"]
+
 @api_router.post("/turnos/generar", response_model=Turno)
 async def generar_turno(datos: TurnoCreate, usuario: Usuario = Depends(obtener_usuario_actual)):
     if usuario.rol not in ["vap", "funcionario", "administrador"]:
@@ -355,16 +2005,8 @@ async def generar_turno(datos: TurnoCreate, usuario: Usuario = Depends(obtener_u
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
     
-    ultimo_turno = await db.turnos.find_one(
-        {"servicio_id": datos.servicio_id},
-        {"_id": 0, "codigo": 1},
-        sort=[("fecha_creacion", -1)]
-    )
-    
-    if ultimo_turno and ultimo_turno.get("codigo"):
-        numero = int(ultimo_turno["codigo"].split("-")[1]) + 1
-    else:
-        numero = 1
+    numero = await siguiente_numero_turno(datos.servicio_id)
+    prioridades = await obtener_prioridades()
     
     codigo = f"{servicio['prefijo']}-{numero:03d}"
     
@@ -377,6 +2019,7 @@ async def generar_turno(datos: TurnoCreate, usuario: Usuario = Depends(obtener_u
         "servicio_id": datos.servicio_id,
         "servicio_nombre": servicio["nombre"],
         "prioridad": datos.prioridad,
+        "prioridad_rango": rango_prioridad(datos.prioridad, prioridades),
         "observaciones": datos.observaciones,
         "estado": "creado",
         "funcionario_id": None,
@@ -396,82 +2039,147 @@ async def generar_turno(datos: TurnoCreate, usuario: Usuario = Depends(obtener_u
         "tipo_usuario": datos.tipo_usuario
     }
     
+    # insert_one agrega el _id (ObjectId) al diccionario; no se envía al cliente
     await db.turnos.insert_one(turno_doc)
+    turno_doc.pop("_id", None)
+    await reflejar_turno(turno_doc)
     
-    await sio.emit('turno_generado', turno_doc)
+    emitir_turno('turno_generado', turno_doc)
     
-    turno_response = await db.turnos.find_one({"id": turno_id}, {"_id": 0})
-    return Turno(**turno_response)
+    return Turno(**turno_doc)
 
-@api_router.get("/turnos/cola/{servicio_id}", response_model=List[Turno])
-async def obtener_cola_turnos(servicio_id: str, usuario: Usuario = Depends(obtener_usuario_actual)):
-    turnos = await db.turnos.find(
-        {"servicio_id": servicio_id, "estado": "creado"},
-        {"_id": 0}
-    ).sort("fecha_creacion", 1).to_list(1000)
-    
-    turnos_ordenados = []
-    for turno in turnos:
-        if turno.get("prioridad"):
-            turnos_ordenados.insert(0, turno)
-        else:
-            turnos_ordenados.append(turno)
-    
-    return [Turno(**t) for t in turnos_ordenados]
+def codificar_cursor(clave: tuple) -> str:
+    """Cursor opaco a partir de la clave de orden del último elemento de la página"""
+    return base64.urlsafe_b64encode(json.dumps(list(clave)).encode()).decode().rstrip("=")
 
-@api_router.get("/turnos/todos", response_model=List[Turno])
-async def obtener_todos_turnos(usuario: Usuario = Depends(obtener_usuario_actual)):
-    if usuario.rol == "funcionario":
-        servicios_ids = usuario.servicios_asignados
-        turnos = await db.turnos.find(
-            {"servicio_id": {"$in": servicios_ids}, "estado": "creado"},
-            {"_id": 0}
-        ).sort("fecha_creacion", 1).to_list(1000)
+def decodificar_cursor(cursor: str, tipos: tuple) -> tuple:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        clave = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if len(clave) != len(tipos) or not all(isinstance(v, t) for v, t in zip(clave, tipos)):
+            raise ValueError(cursor)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+    return tuple(clave)
+
+def publicar_cursor(response: Response, siguiente: Optional[tuple]) -> Response:
+    """El cursor de la página siguiente viaja en la cabecera X-Siguiente-Cursor"""
+    if siguiente is not None:
+        response.headers["X-Siguiente-Cursor"] = codificar_cursor(siguiente)
+    return response
+
+# Clave de orden de la cola en memoria: (prioridad_rango, fecha_creacion, id)
+CURSOR_COLA = (int, str, str)
+# Clave de orden de la lista del día: (fecha_creacion, id) descendente
+CURSOR_LISTA = (str, str)
+
+async def turnos_completos(turnos: List[dict]) -> List[dict]:
+    """Completa una página de resúmenes con el documento entero, en una sola consulta"""
+    documentos = await db.turnos.find({"id": {"$in": [t["id"] for t in turnos]}}, {"_id": 0}).to_list(None)
+    por_id = {d["id"]: d for d in documentos}
+    return [por_id[t["id"]] for t in turnos if t["id"] in por_id]
+
+async def respuesta_cola(turnos: List[dict], siguiente: Optional[tuple], completo: bool) -> Response:
+    if completo:
+        respuesta = respuesta_lista(await turnos_completos(turnos), Turno)
     else:
-        turnos = await db.turnos.find(
-            {"estado": "creado"},
-            {"_id": 0}
-        ).sort("fecha_creacion", 1).to_list(1000)
-    
-    # Ordenar turnos por prioridad
-    turnos_ordenados = []
-    for turno in turnos:
-        if turno.get("prioridad"):
-            turnos_ordenados.insert(0, turno)
-        else:
-            turnos_ordenados.append(turno)
-    
-    return [Turno(**t) for t in turnos_ordenados]
+        respuesta = respuesta_lista(turnos, TurnoResumen)
+    return publicar_cursor(respuesta, siguiente)
+
+@api_router.get("/turnos/cola/{servicio_id}", response_model=List[Union[TurnoResumen, Turno]])
+async def obtener_cola_turnos(
+    servicio_id: str,
+    limite: Optional[int] = Query(None, ge=1, le=PAGINA_MAXIMA),
+    cursor: Optional[str] = None,
+    completo: bool = False,
+    usuario: Usuario = Depends(obtener_usuario_actual)
+):
+    despues = decodificar_cursor(cursor, CURSOR_COLA) if cursor else None
+    turnos, siguiente = motor_cola.pagina([servicio_id], despues, limite)
+    return await respuesta_cola(turnos, siguiente, completo)
+
+@api_router.get("/turnos/todos", response_model=List[Union[TurnoResumen, Turno]])
+async def obtener_todos_turnos(
+    limite: Optional[int] = Query(None, ge=1, le=PAGINA_MAXIMA),
+    cursor: Optional[str] = None,
+    completo: bool = False,
+    usuario: Usuario = Depends(obtener_usuario_actual)
+):
+    despues = decodificar_cursor(cursor, CURSOR_COLA) if cursor else None
+    servicios_ids = usuario.servicios_asignados if usuario.rol == "funcionario" else None
+    turnos, siguiente = motor_cola.pagina(servicios_ids, despues, limite)
+    return await respuesta_cola(turnos, siguiente, completo)
+
+@api_router.get("/turnos/longitudes")
+async def obtener_longitudes_colas(usuario: Usuario = Depends(obtener_usuario_actual)):
+    """Cantidad de turnos en espera por servicio"""
+    return motor_cola.longitudes()
 
 @api_router.get("/turnos/lista-completa", response_model=List[Turno])
-async def obtener_lista_completa_turnos(usuario: Usuario = Depends(obtener_usuario_actual)):
+async def obtener_lista_completa_turnos(
+    limite: Optional[int] = Query(None, ge=1, le=PAGINA_MAXIMA),
+    cursor: Optional[str] = None,
+    usuario: Usuario = Depends(obtener_usuario_actual)
+):
     """Obtiene todos los turnos del día con todos los estados (para VAP y Admin)"""
     if usuario.rol not in ["vap", "administrador"]:
         raise HTTPException(status_code=403, detail="No tienes permisos para ver esta lista")
     
-    # Obtener turnos de hoy
-    hoy = datetime.now(timezone.utc).date().isoformat()
-    
-    turnos = await db.turnos.find(
-        {},
-        {"_id": 0}
-    ).sort("fecha_creacion", -1).to_list(1000)
-    
-    # Filtrar solo los de hoy
-    turnos_hoy = [t for t in turnos if t.get("fecha_creacion", "").startswith(hoy)]
+    # Turnos del día local de la sede; las fechas se guardan como ISO en UTC, que ordena igual que el tiempo
+    inicio = inicio_dia_local()
+    fin = inicio_dia_local(inicio + timedelta(hours=36))
+    filtro = {"fecha_creacion": {"$gte": inicio.isoformat(), "$lt": fin.isoformat()}}
+    
+    if cursor:
+        fecha, turno_id = decodificar_cursor(cursor, CURSOR_LISTA)
+        filtro = {"$and": [filtro, {"$or": [
+            {"fecha_creacion": {"$lt": fecha}},
+            {"fecha_creacion": fecha, "id": {"$lt": turno_id}}
+        ]}]}
+    
+    consulta = db.turnos.find(filtro, {"_id": 0}).sort([("fecha_creacion", -1), ("id", -1)])
+    siguiente = None
+    if limite is not None:
+        turnos = await consulta.limit(limite + 1).to_list(limite + 1)
+        if len(turnos) > limite:
+            turnos = turnos[:limite]
+            siguiente = (turnos[-1]["fecha_creacion"], turnos[-1]["id"])
+    else:
+        turnos = await consulta.to_list(None)
     
-    return [Turno(**t) for t in turnos_hoy]
+    return publicar_cursor(respuesta_lista(turnos, Turno), siguiente)
+
+def literales(valores: dict) -> dict:
+    """Envuelve valores fijos en $literal para usarlos dentro de un pipeline de actualización"""
+    return {campo: {"$literal": valor} for campo, valor in valores.items()}
+
+def segundos_desde(campo: str, hasta: datetime) -> dict:
+    """Expresión que calcula en el servidor los segundos enteros entre un campo ISO del turno y `hasta`"""
+    return {"$toInt": {"$floor": {"$divide": [
+        {"$subtract": [hasta, {"$dateFromString": {"dateString": campo}}]},
+        1000
+    ]}}}
+
+async def transicionar_turno(filtro: dict, actualizacion, detalle_conflicto: str) -> dict:
+    """
+    Aplica una transición de estado como una única actualización condicional.
+    Si el filtro (que incluye el estado esperado) no coincide, otro usuario ganó
+    la carrera o el turno no está disponible: se responde 409 sin lecturas adicionales.
+    """
+    turno_actualizado = await db.turnos.find_one_and_update(
+        filtro,
+        actualizacion,
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if turno_actualizado is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detalle_conflicto)
+    await reflejar_turno(turno_actualizado)
+    return turno_actualizado
 
 @api_router.post("/turnos/cancelar", response_model=Turno)
 async def cancelar_turno_pendiente(datos: TurnoCerrar, usuario: Usuario = Depends(requerir_rol(["administrador"]))):
     """Permite al administrador cancelar/cerrar turnos que están pendientes (estado creado)"""
-    turno = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-    
-    if turno["estado"] != "creado":
-        raise HTTPException(status_code=400, detail="Solo se pueden cancelar turnos en estado pendiente (creado)")
-    
     fecha_cierre = datetime.now(timezone.utc)
     
     update_data = {
@@ -481,59 +2189,81 @@ async def cancelar_turno_pendiente(datos: TurnoCerrar, usuario: Usuario = Depend
         "funcionario_nombre": f"Cancelado por: {usuario.nombre}"
     }
     
-    await db.turnos.update_one({"id": datos.turno_id}, {"$set": update_data})
-    
-    turno_actualizado = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
+    turno_actualizado = await transicionar_turno(
+        {"id": datos.turno_id, "estado": "creado"},
+        {"$set": update_data},
+        "Solo se pueden cancelar turnos en estado pendiente (creado)"
+    )
     
-    await sio.emit('turno_cancelado', turno_actualizado)
+    emitir_turno('turno_cancelado', turno_actualizado)
     
     return Turno(**turno_actualizado)
 
-@api_router.post("/turnos/llamar", response_model=Turno)
-async def llamar_turno(datos: TurnoLlamar, usuario: Usuario = Depends(requerir_rol(["funcionario", "administrador"]))):
-    turno = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-    
-    if turno["estado"] != "creado":
-        raise HTTPException(status_code=400, detail="El turno no está en estado creado")
-    
-    if usuario.rol == "funcionario" and turno["servicio_id"] not in usuario.servicios_asignados:
-        raise HTTPException(status_code=403, detail="No tienes asignado este servicio")
-    
+def actualizacion_llamado(usuario: Usuario, modulo: Optional[str]) -> list:
+    """Pipeline que marca un turno como llamado por el usuario y calcula su tiempo de espera"""
     fecha_llamado = datetime.now(timezone.utc)
-    fecha_creacion = datetime.fromisoformat(turno["fecha_creacion"])
-    tiempo_espera = int((fecha_llamado - fecha_creacion).total_seconds())
     
     # Usar el módulo del usuario si está asignado, sino usar el proporcionado o generar uno
-    modulo_asignado = usuario.modulo or datos.modulo or f"Módulo {usuario.nombre.split()[0]}"
+    modulo_asignado = usuario.modulo or modulo or f"Módulo {usuario.nombre.split()[0]}"
     
-    update_data = {
+    update_data = literales({
         "estado": "llamado",
         "funcionario_id": usuario.id,
         "funcionario_nombre": usuario.nombre,
         "modulo": modulo_asignado,
-        "fecha_llamado": fecha_llamado.isoformat(),
-        "tiempo_espera": tiempo_espera
-    }
+        "fecha_llamado": fecha_llamado.isoformat()
+    })
+    update_data["tiempo_espera"] = segundos_desde("$fecha_creacion", fecha_llamado)
+    return [{"$set": update_data}]
+
+@api_router.post("/turnos/llamar", response_model=Turno)
+async def llamar_turno(datos: TurnoLlamar, usuario: Usuario = Depends(requerir_rol(["funcionario", "administrador"]))):
+    filtro = {"id": datos.turno_id, "estado": "creado"}
+    if usuario.rol == "funcionario":
+        filtro["servicio_id"] = {"$in": usuario.servicios_asignados}
     
-    await db.turnos.update_one({"id": datos.turno_id}, {"$set": update_data})
+    turno_actualizado = await transicionar_turno(
+        filtro,
+        actualizacion_llamado(usuario, datos.modulo),
+        "El turno ya no está disponible para llamar (fue llamado por otro módulo o no pertenece a tus servicios)"
+    )
     
-    turno_actualizado = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
+    emitir_turno('turno_llamado', turno_actualizado)
     
-    await sio.emit('turno_llamado', turno_actualizado)
+    return Turno(**turno_actualizado)
+
+@api_router.post("/turnos/llamar-siguiente", response_model=Turno)
+async def llamar_siguiente_turno(
+    datos: TurnoLlamarSiguiente,
+    usuario: Usuario = Depends(requerir_rol(["funcionario", "administrador"]))
+):
+    """Reclama atómicamente el siguiente turno de la cola (prioritarios primero, luego por orden de llegada)"""
+    filtro = {"estado": "creado"}
+    if usuario.rol == "funcionario":
+        if datos.servicio_id and datos.servicio_id not in usuario.servicios_asignados:
+            raise HTTPException(status_code=403, detail="No tienes asignado este servicio")
+        filtro["servicio_id"] = datos.servicio_id or {"$in": usuario.servicios_asignados}
+    elif datos.servicio_id:
+        filtro["servicio_id"] = datos.servicio_id
+    
+    turno_actualizado = await db.turnos.find_one_and_update(
+        filtro,
+        actualizacion_llamado(usuario, datos.modulo),
+        projection={"_id": 0},
+        sort=ORDEN_COLA,
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if turno_actualizado is None:
+        raise HTTPException(status_code=404, detail="No hay turnos en espera")
+    await reflejar_turno(turno_actualizado)
+    
+    emitir_turno('turno_llamado', turno_actualizado)
     
     return Turno(**turno_actualizado)
 
 @api_router.post("/turnos/atender", response_model=Turno)
 async def atender_turno(datos: TurnoAtender, usuario: Usuario = Depends(requerir_rol(["funcionario", "administrador"]))):
-    turno = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-    
-    if turno["estado"] != "llamado":
-        raise HTTPException(status_code=400, detail="El turno no está en estado llamado")
-    
     fecha_atencion = datetime.now(timezone.utc)
     
     update_data = {
@@ -541,11 +2271,13 @@ async def atender_turno(datos: TurnoAtender, usuario: Usuario = Depends(requerir
         "fecha_atencion": fecha_atencion.isoformat()
     }
     
-    await db.turnos.update_one({"id": datos.turno_id}, {"$set": update_data})
-    
-    turno_actualizado = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
+    turno_actualizado = await transicionar_turno(
+        {"id": datos.turno_id, "estado": "llamado"},
+        {"$set": update_data},
+        "El turno no está en estado llamado"
+    )
     
-    await sio.emit('turno_atendiendo', turno_actualizado)
+    emitir_turno('turno_atendiendo', turno_actualizado)
     
     return Turno(**turno_actualizado)
 
@@ -554,97 +2286,137 @@ async def cerrar_turno(datos: TurnoCerrar, usuario: Usuario = Depends(obtener_us
     if usuario.rol not in ["funcionario", "vap", "administrador"]:
         raise HTTPException(status_code=403, detail="No tienes permisos para cerrar turnos")
     
-    turno = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-    
-    if turno["estado"] == "finalizado":
-        raise HTTPException(status_code=400, detail="El turno ya está finalizado")
-    
     fecha_cierre = datetime.now(timezone.utc)
     
-    tiempo_atencion = None
-    if turno.get("fecha_atencion"):
-        fecha_atencion = datetime.fromisoformat(turno["fecha_atencion"])
-        tiempo_atencion = int((fecha_cierre - fecha_atencion).total_seconds())
-    elif turno.get("fecha_llamado"):
-        fecha_llamado = datetime.fromisoformat(turno["fecha_llamado"])
-        tiempo_atencion = int((fecha_cierre - fecha_llamado).total_seconds())
-    
-    update_data = {
+    update_data = literales({
         "estado": "finalizado",
-        "fecha_cierre": fecha_cierre.isoformat(),
-        "tiempo_atencion": tiempo_atencion
-    }
-    
-    await db.turnos.update_one({"id": datos.turno_id}, {"$set": update_data})
-    
-    turno_actualizado = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
+        "fecha_cierre": fecha_cierre.isoformat()
+    })
+    # El tiempo de atención se mide desde la atención o, si no hubo, desde el llamado
+    update_data["tiempo_atencion"] = {"$switch": {
+        "branches": [
+            {"case": {"$ifNull": ["$fecha_atencion", False]}, "then": segundos_desde("$fecha_atencion", fecha_cierre)},
+            {"case": {"$ifNull": ["$fecha_llamado", False]}, "then": segundos_desde("$fecha_llamado", fecha_cierre)}
+        ],
+        "default": None
+    }}
+    
+    turno_actualizado = await transicionar_turno(
+        {"id": datos.turno_id, "estado": {"$ne": "finalizado"}},
+        [{"$set": update_data}],
+        "El turno ya está finalizado"
+    )
     
-    await sio.emit('turno_finalizado', turno_actualizado)
+    emitir_turno('turno_finalizado', turno_actualizado)
     
     return Turno(**turno_actualizado)
 
 @api_router.post("/turnos/redirigir", response_model=Turno)
 async def redirigir_turno(datos: TurnoRedirigir, usuario: Usuario = Depends(requerir_rol(["funcionario", "administrador"]))):
-    turno = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-    
     servicio = await db.servicios.find_one({"id": datos.nuevo_servicio_id}, {"_id": 0})
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
     
-    update_data = {
+    update_data = literales({
         "servicio_id": datos.nuevo_servicio_id,
         "servicio_nombre": servicio["nombre"],
         "estado": "espera",
         "funcionario_id": None,
         "funcionario_nombre": None
-    }
-    
-    await db.turnos.update_one({"id": datos.turno_id}, {"$set": update_data})
-    
-    turno_actualizado = await db.turnos.find_one({"id": datos.turno_id}, {"_id": 0})
+    })
+    # El servicio de origen queda en el turno para avisar también a su sala
+    update_data["servicio_anterior_id"] = "$servicio_id"
+    
+    turno_actualizado = await transicionar_turno(
+        {"id": datos.turno_id, "estado": {"$nin": ["finalizado", "cancelado"]}},
+        [{"$set": update_data}],
+        "El turno ya fue cerrado y no se puede redirigir"
+    )
     
-    await sio.emit('turno_redirigido', turno_actualizado)
+    emitir_turno('turno_redirigido', turno_actualizado)
     
     return Turno(**turno_actualizado)
 
-@api_router.get("/turnos/llamados-recientes", response_model=List[Turno])
-async def obtener_turnos_llamados_recientes():
-    turnos = await db.turnos.find(
-        {"estado": {"$in": ["llamado", "atendiendo", "finalizado"]}},
-        {"_id": 0}
-    ).sort("fecha_llamado", -1).limit(10).to_list(10)
-    
-    return [Turno(**t) for t in turnos]
+@api_router.get("/turnos/detalle/{turno_id}", response_model=Turno)
+async def obtener_detalle_turno(turno_id: str, usuario: Usuario = Depends(obtener_usuario_actual)):
+    """Documento completo de un turno (datos del cliente y tiempos)"""
+    turno = await db.turnos.find_one({"id": turno_id}, {"_id": 0})
+    if not turno:
+        raise HTTPException(status_code=404, detail="Turno no encontrado")
+    return Turno(**turno)
+
+@api_router.get("/turnos/llamados-recientes", response_model=List[TurnoPantalla])
+async def obtener_turnos_llamados_recientes(request: Request):
+    """
+    Servido desde el buffer en memoria: no consulta MongoDB mientras el buffer esté completo.
+    Es público, así que solo entrega la vista de la pantalla (TurnoPantalla).
+    """
+    turnos = await buffer_llamados.recientes()
+    etag, version = versiones_recursos.vigente("llamados")
+    no_modificado = versiones_recursos.no_modificado(request, etag)
+    if no_modificado is not None:
+        return no_modificado
+    return versiones_recursos.publicar(request, respuesta_lista(turnos, TurnoPantalla), "llamados", version)
+
+@api_router.get("/stream/pantalla")
+async def stream_pantalla(request: Request):
+    """
+    Eventos de la pantalla pública por Server-Sent Events, sin sesión de Socket.IO.
+    Empieza con la instantánea (`llamados`) y sigue con los eventos de la sala pantalla,
+    con id "epoca:seq"; al reconectar, EventSource envía Last-Event-ID y se retoma desde ahí.
+    """
+    return StreamingResponse(
+        difusion_pantalla.suscribir(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        # Sin buffering en nginx para que cada trama llegue de inmediato
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @api_router.get("/configuracion", response_model=Configuracion)
-async def obtener_configuracion(usuario: Usuario = Depends(obtener_usuario_actual)):
+async def obtener_configuracion(request: Request, usuario: Usuario = Depends(obtener_usuario_actual)):
+    etag, version = versiones_recursos.vigente("configuracion")
+    no_modificado = versiones_recursos.no_modificado(request, etag)
+    if no_modificado is not None:
+        return no_modificado
     config = await db.configuracion.find_one({}, {"_id": 0})
     if not config:
-        config_default = {
+        config = {
             "impresion_habilitada": True,
             "prioridades": ["Discapacidad", "Embarazo", "Adulto Mayor"]
         }
-        await db.configuracion.insert_one(config_default)
-        return Configuracion(**config_default)
-    return Configuracion(**config)
+        await db.configuracion.insert_one(dict(config))
+    return versiones_recursos.publicar(
+        request, RespuestaJSON(Configuracion(**config).model_dump()), "configuracion", version
+    )
 
 @api_router.put("/configuracion", response_model=Configuracion)
 async def actualizar_configuracion(
     datos: ConfiguracionUpdate,
     usuario: Usuario = Depends(requerir_rol(["administrador"]))
 ):
+    global prioridades_configuradas
     update_data = {k: v for k, v in datos.model_dump().items() if v is not None}
     
     if not update_data:
         raise HTTPException(status_code=400, detail="No hay datos para actualizar")
     
-    await db.configuracion.update_one({}, {"$set": update_data}, upsert=True)
+    config = await db.configuracion.find_one_and_update(
+        {},
+        {"$set": update_data},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    
+    versiones_recursos.incrementar("configuracion")
+    await avisar_procesos({"tipo": "recurso", "recurso": "configuracion"})
+    
+    if "prioridades" in update_data:
+        prioridades_configuradas = config["prioridades"]
+        await recalcular_rangos_prioridad({"estado": "creado"}, prioridades_configuradas)
+        await motor_cola.cargar()
+        await avisar_procesos({"tipo": "prioridades", "prioridades": prioridades_configuradas})
     
-    config = await db.configuracion.find_one({}, {"_id": 0})
     return Configuracion(**config)
 
 @api_router.get("/clientes/buscar/{numero_documento}")
@@ -779,10 +2551,133 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Tareas en segundo plano iniciadas en el arranque; se cancelan al apagar
+tareas_fondo: list = []
+
+# Índices requeridos por colección; crear_indices() los construye de forma idempotente
+INDICES = {
+    "usuarios": [
+        IndexModel([("id", ASCENDING)], name="id_unico", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unico", unique=True),
+    ],
+    "servicios": [
+        IndexModel([("id", ASCENDING)], name="id_unico", unique=True),
+    ],
+    "turnos": [
+        IndexModel([("id", ASCENDING)], name="id_unico", unique=True),
+        IndexModel(
+            [("servicio_id", ASCENDING), ("estado", ASCENDING), ("prioridad_rango", ASCENDING), ("fecha_creacion", ASCENDING)],
+            name="cola_servicio"
+        ),
+        IndexModel([("estado", ASCENDING), ("fecha_llamado", DESCENDING)], name="estado_llamado"),
+        IndexModel([("fecha_creacion", DESCENDING), ("id", DESCENDING)], name="lista_fecha"),
+        IndexModel([("numero_documento", ASCENDING), ("fecha_creacion", DESCENDING)], name="documento_cliente"),
+        IndexModel([("servicio_id", ASCENDING), ("fecha_creacion", ASCENDING)], name="reporte_servicio"),
+        IndexModel([("funcionario_id", ASCENDING), ("fecha_creacion", ASCENDING)], name="reporte_funcionario"),
+    ],
+    "clientes": [
+        IndexModel([("numero_documento", ASCENDING)], name="numero_documento"),
+    ],
+}
+
+async def crear_indices():
+    for coleccion, indices in INDICES.items():
+        try:
+            await db[coleccion].create_indexes(indices)
+        except OperationFailure as error:
+            # Un índice único sobre datos duplicados no debe impedir que el servidor arranque
+            logger.error(f"No se pudieron crear los índices de {coleccion}: {error}")
+
+def consultas_criticas() -> list:
+    """Consultas calientes de la aplicación, como (nombre, colección, filtro, orden) para explain()"""
+    ahora = datetime.now(timezone.utc)
+    inicio = inicio_dia_local(ahora).isoformat()
+    fin = inicio_dia_local(ahora + timedelta(hours=36)).isoformat()
+    rango = {"$gte": inicio, "$lt": fin}
+    return [
+        ("usuario por email", "usuarios", {"email": "x@unad.edu.co"}, None),
+        ("usuario por id", "usuarios", {"id": "x"}, None),
+        ("servicio por id", "servicios", {"id": "x"}, None),
+        ("transición de turno", "turnos", {"id": "x", "estado": "creado"}, None),
+        ("llamar siguiente", "turnos", {"estado": "creado", "servicio_id": {"$in": ["a", "b"]}}, ORDEN_COLA),
+        ("carga de la cola", "turnos", {"estado": "creado"}, None),
+        ("lista del día", "turnos", {"fecha_creacion": rango}, [("fecha_creacion", -1), ("id", -1)]),
+        ("llamados recientes", "turnos", {"estado": {"$in": ["llamado", "atendiendo", "finalizado"]}}, [("fecha_llamado", -1)]),
+        ("cliente por documento", "clientes", {"numero_documento": "1"}, None),
+        ("último turno del cliente", "turnos", {"numero_documento": "1"}, [("fecha_creacion", -1)]),
+        ("reporte por fechas", "turnos", {"fecha_creacion": rango}, None),
+        ("reporte por servicio", "turnos", {"fecha_creacion": rango, "servicio_id": "x"}, None),
+        ("reporte por funcionario", "turnos", {"fecha_creacion": rango, "funcionario_id": "x"}, None),
+    ]
+
+def etapas_plan(plan: dict) -> List[str]:
+    if "queryPlan" in plan:
+        # Motor de ejecución SBE (MongoDB 5+): el plan lógico viene anidado
+        plan = plan["queryPlan"]
+    etapas = [plan.get("stage")]
+    for hijo in ("inputStage", "outerStage", "innerStage"):
+        if hijo in plan:
+            etapas += etapas_plan(plan[hijo])
+    for hijo in plan.get("inputStages", []):
+        etapas += etapas_plan(hijo)
+    return etapas
+
+async def verificar_planes() -> List[dict]:
+    """Ejecuta explain() sobre cada consulta crítica e indica cuáles recorren la colección completa"""
+    resultados = []
+    for nombre, coleccion, filtro, orden in consultas_criticas():
+        cursor = db[coleccion].find(filtro).limit(10)
+        if orden:
+            cursor = cursor.sort(orden)
+        plan = await cursor.explain()
+        etapas = etapas_plan(plan["queryPlanner"]["winningPlan"])
+        resultados.append({
+            "consulta": nombre,
+            "coleccion": coleccion,
+            "etapas": etapas,
+            "collscan": "COLLSCAN" in etapas
+        })
+    return resultados
+
+@app.on_event("startup")
+async def iniciar_aplicacion():
+    await crear_indices()
+    # Turnos abiertos creados antes de existir prioridad_rango
+    await recalcular_rangos_prioridad(
+        {"estado": "creado", "prioridad_rango": {"$exists": False}},
+        await obtener_prioridades()
+    )
+    await diario_eventos.cargar()
+    if isinstance(sio.manager, BusProcesos):
+        sio.manager.orden.base(await secuencias_salas.compartir())
+        await sio.manager.preparar()
+        # Se escucha el bus desde el arranque (antes de cargar la cola, para no perder
+        # avisos): un worker sin sockets conectados también debe recibirlos
+        sio.manager_initialized = True
+        sio.manager.initialize()
+        tareas_fondo.append(sio.manager.thread)
+    await motor_cola.cargar()
+    await buffer_llamados.cargar()
+    tareas_fondo.append(asyncio.create_task(despachador_eventos.ejecutar()))
+    if COLA_RECONCILIACION_SEGUNDOS > 0:
+        tareas_fondo.append(asyncio.create_task(reconciliar_periodicamente(
+            motor_cola.cargar, COLA_RECONCILIACION_SEGUNDOS, "la cola de turnos"
+        )))
+        tareas_fondo.append(asyncio.create_task(reconciliar_periodicamente(
+            buffer_llamados.cargar, COLA_RECONCILIACION_SEGUNDOS, "los turnos llamados recientes"
+        )))
+        if isinstance(sio.manager, BusProcesos):
+            tareas_fondo.append(asyncio.create_task(reconciliar_periodicamente(
+                reconciliar_avisos, COLA_RECONCILIACION_SEGUNDOS, "los avisos entre workers"
+            )))
+
 # Register shutdown event before creating socket_app
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for tarea in tareas_fondo:
+        tarea.cancel()
     client.close()
+    pool_passwords.cerrar()
 
 socket_app = socketio.ASGIApp(
     sio,
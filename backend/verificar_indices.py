@@ -0,0 +1,31 @@
+import asyncio
+import sys
+
+import server
+
+async def verificar(crear: bool) -> int:
+    if crear:
+        print("Creando índices...")
+        await server.crear_indices()
+    
+    print("Verificando planes de ejecución de las consultas críticas...\n")
+    resultados = await server.verificar_planes()
+    
+    fallidas = 0
+    for resultado in resultados:
+        marca = "COLLSCAN" if resultado["collscan"] else "OK"
+        if resultado["collscan"]:
+            fallidas += 1
+        print(f"[{marca:8}] {resultado['coleccion']:10} {resultado['consulta']:28} {' -> '.join(filter(None, resultado['etapas']))}")
+    
+    server.client.close()
+    
+    if fallidas:
+        print(f"\n{fallidas} consulta(s) recorren la colección completa. Revise INDICES en server.py")
+        return 1
+    print("\n=== Todas las consultas críticas usan índices ===")
+    return 0
+
+if __name__ == "__main__":
+    # Uso: python verificar_indices.py [--sin-crear]
+    sys.exit(asyncio.run(verificar(crear="--sin-crear" not in sys.argv)))
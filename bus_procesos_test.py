@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Worker Bus Test for UNAD Queue Management System
+Runs two Socket.IO servers in one process as if they were two uvicorn workers,
+sharing a GestorMemoria channel, and checks cross-worker delivery, the reordering
+of turno events by sequence and the state notices (avisos) between workers.
+
+Runs in-process; no MongoDB or network needed.
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'turnos_bus_test')
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+import server  # noqa: E402
+import socketio  # noqa: E402
+from socketio import packet  # noqa: E402
+
+REORDEN_MS = 100
+_canales = itertools.count()
+
+
+class Trabajador:
+    """Un servidor Socket.IO con su GestorMemoria y sockets falsos que guardan lo que reciben"""
+    _numeros = itertools.count()
+
+    def __init__(self, canal: str):
+        self.sio = socketio.AsyncServer(async_mode='asgi', client_manager=server.GestorMemoria(channel=canal))
+        self.gestor = self.sio.manager
+        self._sids: dict = {}
+        self.recibidos: dict = {}
+        self.sio.eio.send = self._enviar
+        self.sio.eio.send_packet = lambda eio_sid, paquete_eio: self._enviar(eio_sid, paquete_eio.data)
+
+    def iniciar(self):
+        self.sio.manager_initialized = True
+        self.gestor.initialize()
+
+    async def _enviar(self, eio_sid, datos):
+        paquete = self.sio.packet_class(encoded_packet=datos)
+        if paquete.packet_type == packet.CONNECT:
+            self._sids[eio_sid] = paquete.data["sid"]
+        elif paquete.packet_type == packet.EVENT and eio_sid in self._sids:
+            self.recibidos.setdefault(self._sids[eio_sid], []).append(paquete.data[1]["seq"])
+
+    async def conectar(self, sala: str) -> str:
+        eio_sid = f"eio-{next(self._numeros)}"
+        await self.sio._handle_eio_connect(eio_sid, {})
+        await self.sio._handle_eio_message(
+            eio_sid, self.sio.packet_class(packet.CONNECT, data={}, namespace="/").encode()
+        )
+        await asyncio.sleep(0.01)
+        sid = self._sids[eio_sid]
+        await self.sio.enter_room(sid, sala)
+        return sid
+
+    async def emitir(self, sala: str, seq: int):
+        await self.sio.emit("turno_generado", evento(sala, seq), room=sala)
+
+    def detener(self):
+        self.gestor.thread.cancel()
+
+
+def evento(sala: str, seq: int) -> dict:
+    return {"evento": "turno_generado", "id": f"turno-{seq}", "estado": "creado", "cambios": {},
+            "sala": sala, "seq": seq, "epoca": server.secuencias_salas.epoca}
+
+
+def turno(numero: int, estado: str = "creado") -> dict:
+    return {
+        "id": f"turno-{numero}",
+        "codigo": f"A{numero:03d}",
+        "servicio_id": "servicio-a",
+        "servicio_nombre": "Servicio A",
+        "prioridad": None,
+        "prioridad_rango": server.RANGO_SIN_PRIORIDAD,
+        "estado": estado,
+        "fecha_creacion": f"2024-01-01T08:00:{numero:02d}+00:00",
+    }
+
+
+async def trabajadores(secuencias: dict) -> tuple:
+    """Dos workers en un canal nuevo, con la numeración compartida ya adoptada (como al arrancar)"""
+    server.EVENTOS_REORDEN_MS = REORDEN_MS
+    server.secuencias_salas = server.SecuenciasSalas()
+    server.diario_eventos = server.DiarioEventos(50, False)
+    canal = f"bus-prueba-{next(_canales)}"
+    a, b = Trabajador(canal), Trabajador(canal)
+    for trabajador in (a, b):
+        trabajador.gestor.orden.base(dict(secuencias))
+        trabajador.iniciar()
+    await asyncio.sleep(0.01)
+    return a, b
+
+
+async def esperar_bus():
+    await asyncio.sleep(0.02)
+
+
+def test_entrega_y_orden_entre_workers():
+    async def ejecutar():
+        sala_existente = server.sala_servicio("servicio-a")
+        # Una sala creada después del arranque (p. ej. la de un servicio nuevo) no está en la base
+        sala_nueva = server.sala_servicio("servicio-nuevo")
+        a, b = await trabajadores({sala_existente: 5})
+        socket_a = await a.conectar(sala_nueva)
+        socket_b = await b.conectar(sala_nueva)
+        socket_existente = await b.conectar(sala_existente)
+
+        # Lo que emite un worker llega a los sockets del otro
+        await a.emitir(sala_existente, 6)
+        await esperar_bus()
+        assert b.recibidos[socket_existente] == [6], b.recibidos
+
+        # B publica el 2 antes de que A publique el 1: ambos retienen el 2 hasta tener el 1
+        await b.emitir(sala_nueva, 2)
+        await esperar_bus()
+        assert socket_a not in a.recibidos and socket_b not in b.recibidos, "el 2 se entregó antes que el 1"
+        await a.emitir(sala_nueva, 1)
+        await esperar_bus()
+        assert a.recibidos[socket_a] == [1, 2], a.recibidos
+        assert b.recibidos[socket_b] == [1, 2], b.recibidos
+        assert a.gestor.orden.tardios == b.gestor.orden.tardios == 0
+        assert a.gestor.orden.reordenados == b.gestor.orden.reordenados == 1
+        print("✅ PASS - entrega entre workers y orden en una sala nueva")
+
+        # Un hueco se retiene EVENTOS_REORDEN_MS y después se entrega con el salto
+        await a.emitir(sala_nueva, 4)
+        await asyncio.sleep(REORDEN_MS / 2000)
+        assert b.recibidos[socket_b] == [1, 2], "el 4 se entregó sin esperar al 3"
+        await asyncio.sleep(REORDEN_MS / 1000)
+        assert b.recibidos[socket_b] == [1, 2, 4], b.recibidos
+        assert b.gestor.orden.huecos == 1
+        assert b.gestor.orden.metricas()["retenidos"] == 0
+
+        # El que llega después del vencimiento ya no se entrega
+        await a.emitir(sala_nueva, 3)
+        await esperar_bus()
+        assert b.recibidos[socket_b] == [1, 2, 4], b.recibidos
+        assert b.gestor.orden.tardios == 1
+        print("✅ PASS - hueco entregado tras EVENTOS_REORDEN_MS y evento tardío descartado")
+
+        for trabajador in (a, b):
+            trabajador.detener()
+
+    asyncio.run(ejecutar())
+
+
+def test_avisos_entre_workers():
+    async def ejecutar():
+        server.motor_cola = server.MotorCola()
+        server.buffer_llamados = server.BufferLlamados(server.LLAMADOS_BUFFER)
+        server.buffer_llamados._reconstruir([])
+        server.cache_usuarios.limpiar()
+        a, b = await trabajadores({})
+
+        # Los avisos de A se aplican en B (A ignora los propios)
+        await a.gestor.avisar({"tipo": "turno", "turno": turno(1)})
+        await esperar_bus()
+        assert [t["id"] for t in server.motor_cola.pagina()[0]] == ["turno-1"]
+        await a.gestor.avisar({"tipo": "turno", "turno": turno(1, "llamado")})
+        await esperar_bus()
+        assert server.motor_cola.pagina()[0] == []
+        assert (a.gestor.avisos_recibidos, b.gestor.avisos_recibidos) == (0, 2)
+
+        usuario = server.Usuario(
+            id="funcionario-1", nombre="Funcionario Prueba", email="func@test.com", rol="funcionario",
+            servicios_asignados=["servicio-a"], fecha_creacion="2024-01-01T00:00:00+00:00"
+        )
+        server.cache_usuarios.guardar(usuario.email, usuario)
+        await a.gestor.avisar({"tipo": "usuario", "id": usuario.id, "version": 3,
+                               "usuario": usuario.model_dump()})
+        await esperar_bus()
+        assert server.cache_usuarios.obtener(usuario.email) is None, "el usuario quedó en la caché de B"
+        assert server.versiones_token[usuario.id] == 3
+        print("✅ PASS - avisos de turno y usuario llegan al otro worker")
+
+        for trabajador in (a, b):
+            trabajador.detener()
+
+    asyncio.run(ejecutar())
+
+
+if __name__ == "__main__":
+    print("🚀 Starting Worker Bus Test")
+    print("=" * 60)
+    try:
+        test_entrega_y_orden_entre_workers()
+        test_avisos_entre_workers()
+    except AssertionError as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    print("\n✅ Workers share events and state through the bus")
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Turno Event Pipeline Test for UNAD Queue Management System
+Drives the in-process turno event pipeline with fake Socket.IO clients attached
+to the real `sio` server, and checks what each client receives.
+
+Runs in-process; no MongoDB or network needed.
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'turnos_eventos_test')
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+import server  # noqa: E402
+from socketio import packet  # noqa: E402
+
+
+class ClientesPrueba:
+    """Sockets conectados al servidor `sio` real cuyos paquetes de salida se decodifican y guardan"""
+    _numeros = itertools.count()
+
+    def __init__(self):
+        self._sids: dict = {}
+        self.recibidos: dict = {}
+        server.sio.eio.send = self._enviar
+        # Las emisiones a una sala llegan ya envueltas en un paquete de Engine.IO
+        server.sio.eio.send_packet = lambda eio_sid, paquete_eio: self._enviar(eio_sid, paquete_eio.data)
+
+    async def _enviar(self, eio_sid, datos):
+        paquete = server.sio.packet_class(encoded_packet=datos)
+        if paquete.packet_type == packet.CONNECT:
+            self._sids[eio_sid] = paquete.data["sid"]
+        elif paquete.packet_type == packet.EVENT and eio_sid in self._sids:
+            self.recibidos.setdefault(self._sids[eio_sid], []).append(tuple(paquete.data))
+
+    async def conectar(self, *salas: str) -> str:
+        """Conecta un socket sin token y lo deja solo en `salas`"""
+        eio_sid = f"eio-{next(self._numeros)}"
+        await server.sio._handle_eio_connect(eio_sid, {})
+        await server.sio._handle_eio_message(
+            eio_sid, server.sio.packet_class(packet.CONNECT, data={}, namespace="/").encode()
+        )
+        await asyncio.sleep(0.01)
+        sid = self._sids[eio_sid]
+        await server.sio.leave_room(sid, server.SALA_PANTALLA)
+        for sala in salas:
+            await server.sio.enter_room(sid, sala)
+        return sid
+
+    def eventos(self, sid: str) -> list:
+        """Eventos recibidos por el socket, con los `turnos_lote` ya desarmados"""
+        eventos = []
+        for nombre, datos in self.recibidos.get(sid, []):
+            eventos.extend(datos["eventos"] if nombre == "turnos_lote" else [datos])
+        return eventos
+
+
+async def reiniciar(**despachador) -> "server.DespachadorEventos":
+    """Estado de eventos limpio: sin sockets, secuencias, diario, despachador y stream de la pantalla"""
+    for _, eio_sid in list(server.sio.manager.get_participants("/", None)):
+        await server.sio._handle_eio_disconnect(eio_sid, server.sio.reason.CLIENT_DISCONNECT)
+    server.secuencias_salas = server.SecuenciasSalas()
+    server.diario_eventos = server.DiarioEventos(despachador.pop("diario", 50), False)
+    server.difusion_pantalla = server.DifusionPantalla(16, 2, 0.05)
+    server.buffer_llamados = server.BufferLlamados(server.LLAMADOS_BUFFER)
+    server.buffer_llamados._reconstruir([])
+    opciones = {"max_cola": 1000, "max_lote": 100, "max_pendientes_cliente": 64,
+                "retener_pantalla": 20, "retener_personal": 200}
+    opciones.update(despachador)
+    server.despachador_eventos = server.DespachadorEventos(**opciones)
+    return server.despachador_eventos
+
+
+async def despachar(despachador, espera: float = 0.05):
+    """Corre el despachador hasta que vacía la cola"""
+    tarea = asyncio.create_task(despachador.ejecutar(intervalo_retenidos=0.01))
+    await asyncio.sleep(espera)
+    tarea.cancel()
+
+
+def turno(numero: int, estado: str = "creado", **extra) -> dict:
+    datos = {
+        "id": f"turno-{numero}",
+        "codigo": f"A{numero:03d}",
+        "servicio_id": "servicio-a",
+        "servicio_nombre": "Servicio A",
+        "tipo_documento": "CC",
+        "numero_documento": "1234567890",
+        "nombre_completo": f"Cliente {numero}",
+        "correo": "cliente@test.com",
+        "prioridad": None,
+        "prioridad_rango": server.RANGO_SIN_PRIORIDAD,
+        "estado": estado,
+        "fecha_creacion": f"2024-01-01T08:00:{numero:02d}+00:00",
+    }
+    if estado != "creado":
+        datos.update(modulo="Módulo 1", fecha_llamado=f"2024-01-01T09:00:{numero:02d}+00:00")
+    datos.update(extra)
+    return datos
+
+
+def secuencias(eventos: list) -> list:
+    return [evento["seq"] for evento in eventos]
+
+
+# --- Secuencias por sala y deltas ----------------------------------------------------------
+
+async def probar_secuencias():
+    despachador = await reiniciar()
+    clientes = ClientesPrueba()
+    vap = await clientes.conectar(server.SALA_VAP)
+    servicio = await clientes.conectar(server.sala_servicio("servicio-a"))
+    pantalla = await clientes.conectar(server.SALA_PANTALLA)
+
+    server.emitir_turno("turno_generado", turno(1))
+    server.emitir_turno("turno_generado", turno(2))
+    server.emitir_turno("turno_llamado", turno(1, "llamado"))
+    await despachar(despachador)
+
+    epoca = server.secuencias_salas.epoca
+    for sid in (vap, servicio):
+        eventos = clientes.eventos(sid)
+        assert secuencias(eventos) == [1, 2, 3], secuencias(eventos)
+        assert all(evento["epoca"] == epoca for evento in eventos)
+    generado, _, llamado = clientes.eventos(vap)
+    assert generado["cambios"]["numero_documento"] == "1234567890", "turno_generado lleva el documento completo"
+    assert "numero_documento" not in llamado["cambios"], "las transiciones solo llevan el delta"
+    assert llamado["cambios"]["modulo"] == "Módulo 1"
+
+    # La pantalla solo recibe los llamados, con su propia secuencia y la vista pública
+    eventos_pantalla = clientes.eventos(pantalla)
+    assert [(e["evento"], e["seq"]) for e in eventos_pantalla] == [("turno_llamado", 1)]
+    assert set(eventos_pantalla[0]["cambios"]) <= set(server.TurnoPantalla.model_fields)
+    assert server.secuencias_salas.actual(server.SALA_VAP) == 3
+    assert server.secuencias_salas.actual(server.SALA_PANTALLA) == 1
+    print("✅ PASS - secuencias por sala y deltas por perfil")
+
+
+# --- Diario de eventos y reposición --------------------------------------------------------
+
+async def probar_reposicion():
+    despachador = await reiniciar(diario=3)
+    clientes = ClientesPrueba()
+    vap = await clientes.conectar(server.SALA_VAP)
+    for numero in range(1, 6):
+        server.emitir_turno("turno_generado", turno(numero))
+    await despachar(despachador)
+
+    diario = server.diario_eventos
+    epoca = server.secuencias_salas.epoca
+    assert secuencias(await diario.desde(epoca, server.SALA_VAP, 3, 5)) == [4, 5]
+    assert await diario.desde(epoca, server.SALA_VAP, 5, 5) == []
+    assert await diario.desde(epoca, server.SALA_VAP, 1, 5) is None, "el diario solo conserva los últimos 3"
+    assert await diario.desde("otra-epoca", server.SALA_VAP, 3, 5) is None
+
+    respuesta = await server.reanudar_eventos(vap, {"epoca": epoca, "ultimas": {server.SALA_VAP: 3}})
+    assert respuesta["completo"] is True
+    assert respuesta["secuencias"] == {server.SALA_VAP: 5}
+    assert secuencias(respuesta["eventos"]) == [4, 5]
+
+    for datos in ({"epoca": epoca, "ultimas": {server.SALA_VAP: 1}},
+                  {"epoca": "otra-epoca", "ultimas": {server.SALA_VAP: 3}},
+                  {"epoca": epoca, "ultimas": {}}):
+        respuesta = await server.reanudar_eventos(vap, datos)
+        assert respuesta["completo"] is False and respuesta["eventos"] == [], datos
+        assert respuesta["secuencias"] == {server.SALA_VAP: 5}
+    print("✅ PASS - reposición desde el diario y salto a relectura")
+
+
+# --- Despachador: cola acotada y clientes lentos -------------------------------------------
+
+async def probar_contrapresion():
+    despachador = await reiniciar(max_cola=3)
+    clientes = ClientesPrueba()
+    vap = await clientes.conectar(server.SALA_VAP)
+
+    # La cola llena descarta los más antiguos y deja el hueco en la secuencia
+    for numero in range(1, 6):
+        mensaje = {"evento": "turno_generado", "id": f"turno-{numero}", "sala": server.SALA_VAP}
+        despachador.encolar("turno_generado", mensaje, server.SALA_VAP)
+    assert despachador.metricas()["descartados_cola"] == 2
+    await despachar(despachador)
+    assert [e["id"] for e in clientes.eventos(vap)] == ["turno-3", "turno-4", "turno-5"]
+    assert secuencias(clientes.eventos(vap)) == [3, 4, 5], "los descartados conservan su número"
+    respuesta = await server.reanudar_eventos(vap, {"epoca": server.secuencias_salas.epoca, "ultimas": {server.SALA_VAP: 0}})
+    assert respuesta["completo"] is False
+
+    # Un cliente con el transporte lleno deja de recibir en directo y se le retiene lo suyo
+    despachador = await reiniciar(max_pendientes_cliente=2, retener_personal=2)
+    lento = await clientes.conectar(server.SALA_VAP)
+    rapido = await clientes.conectar(server.SALA_VAP)
+    eio_lento = server.sio.manager.eio_sid_from_sid(lento, "/")
+    transporte = {eio_lento: 5}
+    despachador._pendientes_transporte = lambda eio_sid: transporte.get(eio_sid, 0)
+    clientes.recibidos.clear()
+
+    tarea = asyncio.create_task(despachador.ejecutar(intervalo_retenidos=0.01))
+    for numero in range(1, 4):
+        server.emitir_turno("turno_generado", turno(numero))
+    await asyncio.sleep(0.05)
+    assert secuencias(clientes.eventos(rapido)) == [1, 2, 3]
+    assert clientes.eventos(lento) == []
+    assert despachador.metricas()["mensajes_retenidos"] == 2
+    assert despachador.metricas()["descartados_cliente"] == 1
+
+    transporte[eio_lento] = 0
+    await asyncio.sleep(0.05)
+    tarea.cancel()
+    assert secuencias(clientes.eventos(lento)) == [2, 3], "se entrega lo retenido, en orden"
+    assert despachador.metricas()["clientes_lentos"] == 0
+    print("✅ PASS - cola acotada y retención de clientes lentos")
+
+
+async def probar_fallo_numeracion():
+    despachador = await reiniciar()
+    clientes = ClientesPrueba()
+    vap = await clientes.conectar(server.SALA_VAP)
+    reservar = server.secuencias_salas.reservar
+
+    async def fallar(sala, cantidad):
+        raise RuntimeError("sin conexión a MongoDB")
+
+    server.secuencias_salas.reservar = fallar
+    server.emitir_turno("turno_generado", turno(1))
+    await despachar(despachador)
+    server.secuencias_salas.reservar = reservar
+    server.emitir_turno("turno_generado", turno(2))
+    await despachar(despachador)
+
+    assert despachador.metricas()["errores"] == 3, "un error por sala del evento"
+    assert [(e["id"], e["seq"]) for e in clientes.eventos(vap)] == [("turno-2", 2)], "el fallo deja el salto visible"
+    print("✅ PASS - un fallo al numerar deja el salto en la secuencia")
+
+
+# --- Agrupación de ráfagas -----------------------------------------------------------------
+
+async def probar_agrupacion():
+    despachador = await reiniciar(ventana=0.02)
+    clientes = ClientesPrueba()
+    vap = await clientes.conectar(server.SALA_VAP)
+    pantalla = await clientes.conectar(server.SALA_PANTALLA)
+
+    server.emitir_turno("turno_generado", turno(1))
+    server.emitir_turno("turno_generado", turno(2))
+    server.emitir_turno("turno_llamado", turno(1, "llamado"))
+    await despachar(despachador, 0.1)
+
+    nombre, lote = clientes.recibidos[vap][0]
+    assert len(clientes.recibidos[vap]) == 1 and nombre == "turnos_lote"
+    assert lote["sala"] == server.SALA_VAP and lote["epoca"] == server.secuencias_salas.epoca
+    assert [(e["evento"], e["seq"]) for e in lote["eventos"]] == [
+        ("turno_generado", 1), ("turno_generado", 2), ("turno_llamado", 3)
+    ]
+    # Una sala con un único evento lo recibe tal cual
+    assert [nombre for nombre, _ in clientes.recibidos[pantalla]] == ["turno_llamado"]
+    assert despachador.metricas()["lotes"] >= 1
+    print("✅ PASS - ráfaga agrupada en un turnos_lote por sala")
+
+
+# --- Stream SSE de la pantalla -------------------------------------------------------------
+
+def tramas(datos: bytes) -> list:
+    """(id, evento) de cada trama SSE con datos"""
+    resultado = []
+    for bloque in datos.decode().split("\n\n"):
+        campos = dict(linea.split(": ", 1) for linea in bloque.splitlines() if ": " in linea and not linea.startswith(":"))
+        if "event" in campos:
+            resultado.append((campos["id"], campos["event"]))
+    return resultado
+
+
+async def probar_stream_pantalla():
+    despachador = await reiniciar()
+    difusion = server.difusion_pantalla
+    epoca = server.secuencias_salas.epoca
+
+    stream = difusion.suscribir(None)
+    assert await stream.__anext__() == b"retry: 3000\n\n"
+    assert tramas(await stream.__anext__()) == [(f"{epoca}:0", "llamados")]
+    assert await stream.__anext__() == b": latido\n\n"
+
+    siguiente = asyncio.ensure_future(stream.__anext__())
+    server.emitir_turno("turno_llamado", turno(1, "llamado"))
+    await despachar(despachador)
+    assert tramas(await siguiente) == [(f"{epoca}:1", "turno_llamado")]
+    await stream.aclose()
+    assert difusion.suscriptores == 0
+
+    for numero in range(2, 5):
+        server.emitir_turno("turno_llamado", turno(numero, "llamado"))
+    await despachar(despachador)
+
+    # Last-Event-ID dentro del buffer: se retoma con lo que falta, sin instantánea
+    stream = difusion.suscribir(f"{epoca}:2")
+    await stream.__anext__()
+    assert tramas(await stream.__anext__()) == [(f"{epoca}:{seq}", "turno_llamado") for seq in (3, 4)]
+    await stream.aclose()
+
+    # Más atrasado que max_pendientes (2), o de otra época: instantánea
+    for ultimo_id in (f"{epoca}:1", "otra-epoca:3", "basura"):
+        stream = difusion.suscribir(ultimo_id)
+        await stream.__anext__()
+        assert tramas(await stream.__anext__()) == [(f"{epoca}:4", "llamados")], ultimo_id
+        await stream.aclose()
+    assert difusion.metricas()["publicadas"] == 4
+    print("✅ PASS - stream SSE con instantánea, reanudación y latido")
+
+
+async def ejecutar():
+    await probar_secuencias()
+    await probar_reposicion()
+    await probar_contrapresion()
+    await probar_fallo_numeracion()
+    await probar_agrupacion()
+    await probar_stream_pantalla()
+
+
+def test_eventos_turno():
+    asyncio.run(ejecutar())
+
+
+if __name__ == "__main__":
+    print("🚀 Starting Turno Event Pipeline Test")
+    print("=" * 60)
+    try:
+        test_eventos_turno()
+    except AssertionError as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    print("\n✅ Turno events are sequenced, replayed and delivered as expected")
@@ -1,17 +1,31 @@
 import React, { createContext, useContext, useEffect, useState } from 'react';
 import { io } from 'socket.io-client';
+import msgpackParser from 'socket.io-msgpack-parser';
+import { useAuth } from './AuthContext';
 
 const SocketContext = createContext(null);
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+// Debe coincidir con SOCKETIO_SERIALIZADOR=msgpack en el backend
+const SOCKET_MSGPACK = process.env.REACT_APP_SOCKET_MSGPACK === 'true';
 
 export const SocketProvider = ({ children }) => {
   const [socket, setSocket] = useState(null);
   const [conectado, setConectado] = useState(false);
+  const { token } = useAuth();
 
+  // El servidor une el socket a las salas del rol del token. Sin sesión no se abre socket:
+  // la pantalla pública recibe sus eventos por SSE (/api/stream/pantalla)
   useEffect(() => {
+    if (!token) {
+      setSocket(null);
+      setConectado(false);
+      return undefined;
+    }
     const newSocket = io(BACKEND_URL, {
-      transports: ['websocket', 'polling']
+      transports: ['websocket', 'polling'],
+      auth: { token },
+      ...(SOCKET_MSGPACK ? { parser: msgpackParser } : {})
     });
 
     newSocket.on('connect', () => {
@@ -29,7 +43,7 @@ export const SocketProvider = ({ children }) => {
     return () => {
       newSocket.close();
     };
-  }, []);
+  }, [token]);
 
   return (
     <SocketContext.Provider value={{ socket, conectado }}>
@@ -8,6 +8,23 @@ const getAuthHeaders = () => {
   return token ? { Authorization: `Bearer ${token}` } : {};
 };
 
+// Recorre un endpoint paginado por cursor (cabecera X-Siguiente-Cursor).
+// alRecibirPagina recibe la lista acumulada tras cada página para pintar la primera pantalla de inmediato.
+const obtenerPaginado = async (url, { limite = 100, params = {}, alRecibirPagina } = {}) => {
+  const acumulado = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      params: cursor ? { ...params, limite, cursor } : { ...params, limite },
+      headers: getAuthHeaders()
+    });
+    acumulado.push(...response.data);
+    if (alRecibirPagina) alRecibirPagina([...acumulado]);
+    cursor = response.headers['x-siguiente-cursor'];
+  } while (cursor);
+  return { data: acumulado };
+};
+
 export const api = {
   usuarios: {
     listar: () => axios.get(`${API}/usuarios`, { headers: getAuthHeaders() }),
@@ -23,15 +40,19 @@ export const api = {
   },
   turnos: {
     generar: (data) => axios.post(`${API}/turnos/generar`, data, { headers: getAuthHeaders() }),
-    obtenerCola: (servicioId) => axios.get(`${API}/turnos/cola/${servicioId}`, { headers: getAuthHeaders() }),
-    obtenerTodos: () => axios.get(`${API}/turnos/todos`, { headers: getAuthHeaders() }),
-    obtenerListaCompleta: () => axios.get(`${API}/turnos/lista-completa`, { headers: getAuthHeaders() }),
+    obtenerCola: (servicioId, opciones) => obtenerPaginado(`${API}/turnos/cola/${servicioId}`, opciones),
+    obtenerTodos: (opciones) => obtenerPaginado(`${API}/turnos/todos`, opciones),
+    obtenerListaCompleta: (opciones) => obtenerPaginado(`${API}/turnos/lista-completa`, opciones),
+    obtenerDetalle: (turnoId) => axios.get(`${API}/turnos/detalle/${turnoId}`, { headers: getAuthHeaders() }),
     llamar: (data) => axios.post(`${API}/turnos/llamar`, data, { headers: getAuthHeaders() }),
+    llamarSiguiente: (data) => axios.post(`${API}/turnos/llamar-siguiente`, data, { headers: getAuthHeaders() }),
     atender: (data) => axios.post(`${API}/turnos/atender`, data, { headers: getAuthHeaders() }),
     cerrar: (data) => axios.post(`${API}/turnos/cerrar`, data, { headers: getAuthHeaders() }),
     cancelar: (data) => axios.post(`${API}/turnos/cancelar`, data, { headers: getAuthHeaders() }),
     redirigir: (data) => axios.post(`${API}/turnos/redirigir`, data, { headers: getAuthHeaders() }),
-    obtenerLlamadosRecientes: () => axios.get(`${API}/turnos/llamados-recientes`)
+    obtenerLlamadosRecientes: () => axios.get(`${API}/turnos/llamados-recientes`),
+    // Stream SSE de la pantalla pública (para EventSource)
+    urlStreamPantalla: `${API}/stream/pantalla`
   },
   configuracion: {
     obtener: () => axios.get(`${API}/configuracion`, { headers: getAuthHeaders() }),
@@ -0,0 +1,211 @@
+import { useEffect, useRef } from 'react';
+
+/*
+ * Contrato de los eventos de turno (Socket.IO)
+ *
+ * Cada evento `turno_*` llega a las salas del cliente con la forma:
+ *   { evento, sala, epoca, seq, id, estado, cambios }
+ *
+ * - `seq` es la secuencia de `sala` y aumenta de 1 en 1 en cada evento de esa sala.
+ *   `epoca` cambia cuando el servidor se reinicia (las secuencias empiezan de nuevo).
+ * - `cambios` trae los campos que modificó la transición. En `turno_generado` es el
+ *   documento completo; en los demás incluye siempre la fila de la cola (id, codigo,
+ *   servicio_id, servicio_nombre, prioridad, prioridad_rango, estado, fecha_creacion).
+ *   En la sala `pantalla` los cambios se limitan a la vista pública del turno (id, codigo,
+ *   servicio_nombre, estado, modulo, nombre_completo, fecha_llamado).
+ *
+ * Agrupación: si el servidor tiene una ventana de agrupación (EVENTOS_VENTANA_MS), los
+ * eventos de una sala dentro de la ventana llegan juntos como
+ *   turnos_lote: { sala, epoca, eventos: [evento, ...] }
+ * en orden de secuencia. Se procesan en el mismo manejador, así React agrupa las
+ * actualizaciones de estado y la vista se pinta una vez por lote.
+ *
+ * Reductor: se fusiona `cambios` sobre la fila con el mismo `id` (o se agrega si la
+ * vista la incluye), se quita si deja de pertenecer a la vista y se reordena. Aplicar
+ * el mismo evento dos veces da el mismo resultado.
+ *
+ * Reposición: al (re)conectar o al detectar un salto (seq distinto de la última + 1)
+ * el cliente emite `reanudar` con { epoca, ultimas: { sala: seq } }. El servidor
+ * responde con las secuencias actuales de las salas del socket y, si su diario conserva
+ * todo lo perdido, los eventos faltantes (`completo`). Si no (época distinta, sala sin
+ * base o eventos demasiado antiguos) la vista vuelve a leer la lista completa y toma
+ * esas secuencias como base. Si la respuesta no llega (desconexión o espera vencida) se
+ * vuelve a pedir al reconectar, conservando los eventos recibidos mientras tanto.
+ *
+ * Pantalla pública por SSE (GET /api/stream/pantalla): el stream empieza con
+ *   llamados: [turno, ...]   (instantánea, vista pública)
+ * y sigue con los eventos de la sala `pantalla` con la misma forma de arriba. El id de
+ * cada trama es "epoca:seq"; EventSource lo reenvía como Last-Event-ID al reconectar y el
+ * servidor retoma desde ahí o, si ya no puede, vuelve a enviar la instantánea.
+ */
+
+// Espera máxima por la respuesta de `reanudar`; sin respuesta se vuelve a pedir
+const REANUDAR_ESPERA_MS = 5000;
+
+export const EVENTOS_TURNO = [
+  'turno_generado',
+  'turno_llamado',
+  'turno_atendiendo',
+  'turno_finalizado',
+  'turno_cancelado',
+  'turno_redirigido'
+];
+
+// Aplica un evento a una lista de turnos según las reglas de la vista
+export const aplicarEvento = (turnos, evento, { incluir, ordenar, limite }) => {
+  const indice = turnos.findIndex((t) => t.id === evento.id);
+  const turno = { ...(indice >= 0 ? turnos[indice] : {}), ...evento.cambios };
+  const resto = indice >= 0 ? turnos.filter((_, i) => i !== indice) : turnos;
+
+  if (!incluir(turno)) {
+    return indice >= 0 ? resto : turnos;
+  }
+  const resultado = [...resto, turno];
+  if (ordenar) resultado.sort(ordenar);
+  return limite ? resultado.slice(0, limite) : resultado;
+};
+
+// Lleva la última secuencia aplicada por sala
+export const crearSeguimientoSecuencias = () => {
+  let epoca = null;
+  let ultimas = {};
+
+  return {
+    // 'nuevo' si es el siguiente de su sala, 'repetido' si ya se aplicó y 'salto' si faltan eventos
+    clasificar(evento) {
+      const ultima = ultimas[evento.sala];
+      if (evento.epoca !== epoca || ultima === undefined) return 'salto';
+      if (evento.seq <= ultima) return 'repetido';
+      return evento.seq === ultima + 1 ? 'nuevo' : 'salto';
+    },
+    avanzar(evento) {
+      ultimas[evento.sala] = evento.seq;
+    },
+    estado() {
+      return { epoca, ultimas: { ...ultimas } };
+    },
+    establecerBase(nuevaEpoca, secuencias) {
+      epoca = nuevaEpoca;
+      ultimas = { ...secuencias };
+    }
+  };
+};
+
+// Suscribe la pantalla pública al stream SSE: alInstantanea(turnos) con la lista completa
+// (al conectar o si se atrasó demasiado) y alEvento(evento) para cada evento
+export const useStreamPantalla = (url, { alEvento, alInstantanea }) => {
+  const alEventoRef = useRef(alEvento);
+  const alInstantaneaRef = useRef(alInstantanea);
+  alEventoRef.current = alEvento;
+  alInstantaneaRef.current = alInstantanea;
+
+  useEffect(() => {
+    // EventSource se reconecta solo y envía el último id recibido
+    const fuente = new EventSource(url);
+    const manejarEvento = (mensaje) => alEventoRef.current(JSON.parse(mensaje.data));
+    const manejarInstantanea = (mensaje) => alInstantaneaRef.current(JSON.parse(mensaje.data));
+
+    fuente.addEventListener('llamados', manejarInstantanea);
+    EVENTOS_TURNO.forEach((nombre) => fuente.addEventListener(nombre, manejarEvento));
+    return () => fuente.close();
+  }, [url]);
+};
+
+// Suscribe la vista a los eventos de turno: alEvento(evento) para cada evento nuevo y
+// alResincronizar() cuando los eventos perdidos ya no se pueden reponer.
+export const useEventosTurnos = (socket, { alEvento, alResincronizar, eventos = EVENTOS_TURNO }) => {
+  const alEventoRef = useRef(alEvento);
+  const alResincronizarRef = useRef(alResincronizar);
+  alEventoRef.current = alEvento;
+  alResincronizarRef.current = alResincronizar;
+
+  useEffect(() => {
+    if (!socket) return undefined;
+    const seguimiento = crearSeguimientoSecuencias();
+    // Eventos en vivo recibidos mientras se espera la respuesta de `reanudar`
+    let enEspera = null;
+    // Solo se atiende la respuesta del último pedido (las anteriores llegan tarde o con error)
+    let intento = 0;
+
+    // Todos los eventos cuentan para la secuencia; la vista solo recibe los que le interesan
+    const entregar = (evento) => {
+      if (eventos.includes(evento.evento)) alEventoRef.current(evento);
+    };
+
+    const aplicar = (evento) => {
+      seguimiento.avanzar(evento);
+      entregar(evento);
+    };
+
+    const procesar = (evento) => {
+      const tipo = seguimiento.clasificar(evento);
+      if (tipo === 'nuevo') aplicar(evento);
+      return tipo !== 'salto';
+    };
+
+    const pedirReanudacion = () => {
+      const actual = ++intento;
+      socket.timeout(REANUDAR_ESPERA_MS).emit('reanudar', seguimiento.estado(), (error, respuesta) => {
+        if (actual !== intento) return;
+        if (error) {
+          // Sin conexión el pedido se repite en 'connect'; conectado, se repite ya
+          if (socket.connected) pedirReanudacion();
+          return;
+        }
+        const recibidos = enEspera;
+        enEspera = null;
+        const { ultimas } = seguimiento.estado();
+
+        if (respuesta.completo) {
+          respuesta.eventos
+            .filter((evento) => ultimas[evento.sala] === undefined || evento.seq > ultimas[evento.sala])
+            .forEach(entregar);
+        } else {
+          alResincronizarRef.current();
+        }
+        seguimiento.establecerBase(respuesta.epoca, respuesta.secuencias);
+
+        // Los eventos de una época anterior quedan cubiertos por la relectura
+        const pendientes = recibidos
+          .filter((evento) => evento.epoca === respuesta.epoca)
+          .filter((evento) => !procesar(evento));
+        if (pendientes.length > 0) {
+          reanudar();
+          enEspera.push(...pendientes);
+        }
+      });
+    };
+
+    const reanudar = () => {
+      if (enEspera) return;
+      enEspera = [];
+      pedirReanudacion();
+    };
+
+    // Un pedido en curso al desconectarse pierde su respuesta: se pide de nuevo
+    const alConectar = () => (enEspera ? pedirReanudacion() : reanudar());
+
+    const manejarEvento = (evento) => {
+      if (enEspera) {
+        enEspera.push(evento);
+      } else if (!procesar(evento)) {
+        reanudar();
+        enEspera.push(evento);
+      }
+    };
+
+    const manejarLote = (lote) => lote.eventos.forEach(manejarEvento);
+
+    EVENTOS_TURNO.forEach((nombre) => socket.on(nombre, manejarEvento));
+    socket.on('turnos_lote', manejarLote);
+    socket.on('connect', alConectar);
+    if (socket.connected) reanudar();
+    return () => {
+      intento += 1;
+      EVENTOS_TURNO.forEach((nombre) => socket.off(nombre, manejarEvento));
+      socket.off('turnos_lote', manejarLote);
+      socket.off('connect', alConectar);
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [socket]);
+};
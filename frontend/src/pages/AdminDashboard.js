@@ -45,7 +45,8 @@ const AdminDashboard = () => {
 
   const cargarTurnosPendientes = async () => {
     try {
-      const response = await api.turnos.obtenerTodos();
+      // Vista completa: la tabla muestra nombre y documento del cliente
+      const response = await api.turnos.obtenerTodos({ params: { completo: true } });
       setTurnosPendientes(response.data.filter(t => t.estado === 'creado'));
     } catch (error) {
       console.error('Error al cargar turnos pendientes:', error);
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { api } from '../lib/api';
 import { useSocket } from '../context/SocketContext';
 import { useAuth } from '../context/AuthContext';
+import { aplicarEvento, useEventosTurnos } from '../lib/eventosTurnos';
 import { Button } from '../components/ui/button';
 import { Card } from '../components/ui/card';
 import { Input } from '../components/ui/input';
@@ -103,79 +104,41 @@ const FuncionarioDashboard = () => {
     }
   };
 
-  useEffect(() => {
-    if (socket) {
-      // Escuchar nuevo turno generado
-      const handleTurnoGenerado = (turno) => {
-        console.log('Turno generado recibido:', turno);
-        cargarTurnos();
+  // Aplicar los eventos de WebSocket sobre la cola sin volver a consultarla
+  useEventosTurnos(socket, {
+    alEvento: (evento) => {
+      const { cambios } = evento;
+      const esMiServicio = usuario?.servicios_asignados?.includes(cambios.servicio_id);
+
+      setTurnos((turnosActuales) => aplicarEvento(turnosActuales, evento, {
+        incluir: (turno) => turno.estado === 'creado' &&
+          (usuario?.rol !== 'funcionario' || usuario?.servicios_asignados?.includes(turno.servicio_id)),
+        ordenar: (a, b) => (a.prioridad_rango - b.prioridad_rango) ||
+          (new Date(a.fecha_creacion) - new Date(b.fecha_creacion))
+      }));
+
+      if (evento.evento === 'turno_generado' && esMiServicio) {
+        toast.info(
+          `🔔 Nuevo turno ${cambios.codigo} en ${cambios.servicio_nombre}`,
+          {
+            duration: 5000
+          }
+        );
         
-        // Verificar si el turno es para los servicios del funcionario
-        if (usuario?.servicios_asignados?.includes(turno.servicio_id)) {
-          toast.info(
-            `🔔 Nuevo turno ${turno.codigo} en ${turno.servicio_nombre}`,
-            {
-              duration: 5000
-            }
-          );
-          
-          // Sonido de notificación
-          try {
-            const audio = new Audio('data:audio/wav;base64,UklGRnoGAABXQVZFZm10IBAAAAABAAEAQB8AAEAfAAABAAgAZGF0YQoGAACBhYqFbF1sbJuYj4CAUF2FoqKJclVVb5Gkm4l0XV1xi5+XjH1oZXKFko+IgHdyd4CHiYmIhYKChYeJiYmHhYODhYeJiYmIhoSEhYeIiIiHhoWFhoeIiIiHhoWFhoeIiIeHhoaGh4eIiIeHhoaGh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHhw==');
-            audio.volume = 0.5;
-            audio.play().catch(() => {});
-          } catch (e) {}
-        }
-      };
-
-      // Escuchar turno llamado (actualizar cola)
-      const handleTurnoLlamado = () => {
-        console.log('Turno llamado - actualizando cola');
-        cargarTurnos();
-      };
-
-      // Escuchar turno cerrado/finalizado
-      const handleTurnoCerrado = () => {
-        console.log('Turno cerrado - actualizando cola');
-        cargarTurnos();
-      };
-
-      // Escuchar turno cancelado
-      const handleTurnoCancelado = () => {
-        console.log('Turno cancelado - actualizando cola');
-        cargarTurnos();
-      };
-
-      // Escuchar turno redirigido
-      const handleTurnoRedirigido = (turno) => {
-        console.log('Turno redirigido:', turno);
-        cargarTurnos();
-        if (usuario?.servicios_asignados?.includes(turno.servicio_id)) {
-          toast.info(`🔄 Turno ${turno.codigo} redirigido a ${turno.servicio_nombre}`);
-        }
-      };
+        // Sonido de notificación
+        try {
+          const audio = new Audio('data:audio/wav;base64,UklGRnoGAABXQVZFZm10IBAAAAABAAEAQB8AAEAfAAABAAgAZGF0YQoGAACBhYqFbF1sbJuYj4CAUF2FoqKJclVVb5Gkm4l0XV1xi5+XjH1oZXKFko+IgHdyd4CHiYmIhYKChYeJiYmHhYODhYeJiYmIhoSEhYeIiIiHhoWFhoeIiIiHhoWFhoeIiIeHhoaGh4eIiIeHhoaGh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHhw==');
+          audio.volume = 0.5;
+          audio.play().catch(() => {});
+        } catch (e) {}
+      }
 
-      socket.on('turno_generado', handleTurnoGenerado);
-      socket.on('nuevo_turno', handleTurnoGenerado); // Por compatibilidad
-      socket.on('turno_llamado', handleTurnoLlamado);
-      socket.on('turno_cerrado', handleTurnoCerrado);
-      socket.on('turno_finalizado', handleTurnoCerrado);
-      socket.on('turno_cancelado', handleTurnoCancelado);
-      socket.on('turno_redirigido', handleTurnoRedirigido);
-      socket.on('turno_atendiendo', handleTurnoLlamado);
-
-      return () => {
-        socket.off('turno_generado', handleTurnoGenerado);
-        socket.off('nuevo_turno', handleTurnoGenerado);
-        socket.off('turno_llamado', handleTurnoLlamado);
-        socket.off('turno_cerrado', handleTurnoCerrado);
-        socket.off('turno_finalizado', handleTurnoCerrado);
-        socket.off('turno_cancelado', handleTurnoCancelado);
-        socket.off('turno_redirigido', handleTurnoRedirigido);
-        socket.off('turno_atendiendo', handleTurnoLlamado);
-      };
-    }
-  }, [socket, usuario]);
+      if (evento.evento === 'turno_redirigido' && esMiServicio) {
+        toast.info(`🔄 Turno ${cambios.codigo} redirigido a ${cambios.servicio_nombre}`);
+      }
+    },
+    alResincronizar: () => cargarTurnos()
+  });
 
   const cargarTurnos = async () => {
     try {
@@ -200,32 +163,19 @@ const FuncionarioDashboard = () => {
   };
 
   const handleLlamar = async () => {
-    if (turnos.length === 0) {
-      toast.error('No hay turnos en espera');
-      return;
-    }
-
-    const turnosDisponibles = turnos.filter(t => 
-      usuario.servicios_asignados.includes(t.servicio_id)
-    );
-
-    if (turnosDisponibles.length === 0) {
-      toast.error('No hay turnos disponibles para tus servicios');
-      return;
-    }
-
-    const siguienteTurno = turnosDisponibles[0];
-
     try {
-      const response = await api.turnos.llamar({ 
-        turno_id: siguienteTurno.id,
+      // El servidor reclama atómicamente el siguiente turno de los servicios asignados
+      const response = await api.turnos.llamarSiguiente({
         modulo: `Módulo ${usuario.nombre.split(' ')[0]}`
       });
       setTurnoActual(response.data);
       toast.success(`Turno ${response.data.codigo} llamado`);
-      cargarTurnos();
     } catch (error) {
-      toast.error(error.response?.data?.detail || 'Error al llamar turno');
+      if (error.response?.status === 404) {
+        toast.error('No hay turnos disponibles para tus servicios');
+      } else {
+        toast.error(error.response?.data?.detail || 'Error al llamar turno');
+      }
     }
   };
 
@@ -258,7 +208,6 @@ const FuncionarioDashboard = () => {
       await api.turnos.cerrar({ turno_id: turnoActual.id });
       toast.success(`Turno ${turnoActual.codigo} cerrado`);
       setTurnoActual(null);
-      cargarTurnos();
     } catch (error) {
       toast.error('Error al cerrar turno');
     }
@@ -293,7 +242,6 @@ const FuncionarioDashboard = () => {
         observaciones: ''
       });
       
-      cargarTurnos();
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Error al generar turno');
     }
@@ -316,7 +264,6 @@ const FuncionarioDashboard = () => {
       setDialogRedirigir(false);
       setServicioRedirigir('');
       setTurnoActual(null);
-      cargarTurnos();
     } catch (error) {
       toast.error('Error al redireccionar turno');
     }
@@ -1,11 +1,14 @@
 import React, { useEffect, useState, useRef } from 'react';
 import { api } from '../lib/api';
-import { useSocket } from '../context/SocketContext';
+import { aplicarEvento, useStreamPantalla } from '../lib/eventosTurnos';
+
+const EVENTOS_PANTALLA = ['turno_llamado', 'turno_atendiendo', 'turno_finalizado', 'turno_redirigido'];
+const ESTADOS_LLAMADOS = ['llamado', 'atendiendo', 'finalizado'];
+const LLAMADOS_VISIBLES = 10;
 
 const PantallaPublica = () => {
   const [turnosLlamados, setTurnosLlamados] = useState([]);
   const [turnoActual, setTurnoActual] = useState(null);
-  const { socket } = useSocket();
   const audioContextRef = useRef(null);
   const [sonando, setSonando] = useState(false);
   const intervaloSonidoRef = useRef(null);
@@ -49,40 +52,36 @@ const PantallaPublica = () => {
     }
   };
 
-  useEffect(() => {
-    cargarTurnosLlamados();
-
-    const interval = setInterval(cargarTurnosLlamados, 5000);
-    return () => clearInterval(interval);
-  }, []);
+  const aplicarTurnosLlamados = (turnos) => {
+    setTurnosLlamados(turnos);
+    if (turnos.length > 0 && turnos[0].estado === 'llamado') {
+      setTurnoActual(turnos[0]);
+    }
+  };
 
-  useEffect(() => {
-    if (socket) {
-      socket.on('turno_llamado', (turno) => {
-        setTurnoActual(turno);
+  // El stream SSE empieza con la instantánea de los llamados y la repite cuando no puede
+  // reponer lo perdido; después envía los eventos de la sala de la pantalla
+  useStreamPantalla(api.turnos.urlStreamPantalla, {
+    alInstantanea: aplicarTurnosLlamados,
+    alEvento: (evento) => {
+      if (!EVENTOS_PANTALLA.includes(evento.evento)) return;
+      setTurnosLlamados((turnos) => aplicarEvento(turnos, evento, {
+        incluir: (turno) => ESTADOS_LLAMADOS.includes(turno.estado) && !!turno.fecha_llamado,
+        ordenar: (a, b) => new Date(b.fecha_llamado) - new Date(a.fecha_llamado),
+        limite: LLAMADOS_VISIBLES
+      }));
+
+      if (evento.evento === 'turno_llamado') {
+        setTurnoActual(evento.cambios);
         iniciarSonidoRepetitivo(); // Iniciar sonido cuando se llama
-        cargarTurnosLlamados();
-      });
-
-      socket.on('turno_atendiendo', (turno) => {
-        setTurnoActual(turno);
+      } else if (evento.evento === 'turno_atendiendo') {
+        setTurnoActual(evento.cambios);
         detenerSonido(); // Detener sonido cuando pasa a atender
-        cargarTurnosLlamados();
-      });
-
-      socket.on('turno_finalizado', () => {
-        detenerSonido();
-        cargarTurnosLlamados();
-      });
-
-      return () => {
-        socket.off('turno_llamado');
-        socket.off('turno_atendiendo');
-        socket.off('turno_finalizado');
+      } else if (evento.evento === 'turno_finalizado') {
         detenerSonido();
-      };
+      }
     }
-  }, [socket]);
+  });
 
   // Limpiar intervalo al desmontar
   useEffect(() => {
@@ -91,18 +90,6 @@ const PantallaPublica = () => {
     };
   }, []);
 
-  const cargarTurnosLlamados = async () => {
-    try {
-      const response = await api.turnos.obtenerLlamadosRecientes();
-      setTurnosLlamados(response.data);
-      if (response.data.length > 0 && response.data[0].estado === 'llamado') {
-        setTurnoActual(response.data[0]);
-      }
-    } catch (error) {
-      console.error('Error al cargar turnos llamados:', error);
-    }
-  };
-
   return (
     <div className="min-h-screen !bg-slate-900 text-white" style={{backgroundColor: '#0f172a'}} data-testid="pantalla-publica">
       <div className="grid grid-cols-12 h-screen">
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { api } from '../lib/api';
 import { useSocket } from '../context/SocketContext';
+import { aplicarEvento, useEventosTurnos } from '../lib/eventosTurnos';
 import { Button } from '../components/ui/button';
 import { Card } from '../components/ui/card';
 import { Input } from '../components/ui/input';
@@ -14,6 +15,12 @@ import {
 import { toast } from 'sonner';
 import { Ticket, Printer, CheckCircle, Clock, PhoneCall, UserCheck, XCircle, RefreshCw } from 'lucide-react';
 
+const inicioDelDia = () => {
+  const hoy = new Date();
+  hoy.setHours(0, 0, 0, 0);
+  return hoy;
+};
+
 const VAPDashboard = () => {
   const { socket } = useSocket();
   const [servicios, setServicios] = useState([]);
@@ -40,30 +47,16 @@ const VAPDashboard = () => {
     cargarTurnosHoy();
   }, []);
 
-  // Escuchar eventos de WebSocket para actualizar la lista en tiempo real
-  useEffect(() => {
-    if (socket) {
-      const actualizarLista = () => {
-        cargarTurnosHoy();
-      };
-
-      socket.on('turno_generado', actualizarLista);
-      socket.on('turno_llamado', actualizarLista);
-      socket.on('turno_atendiendo', actualizarLista);
-      socket.on('turno_finalizado', actualizarLista);
-      socket.on('turno_cancelado', actualizarLista);
-      socket.on('turno_redirigido', actualizarLista);
-
-      return () => {
-        socket.off('turno_generado', actualizarLista);
-        socket.off('turno_llamado', actualizarLista);
-        socket.off('turno_atendiendo', actualizarLista);
-        socket.off('turno_finalizado', actualizarLista);
-        socket.off('turno_cancelado', actualizarLista);
-        socket.off('turno_redirigido', actualizarLista);
-      };
-    }
-  }, [socket]);
+  // Aplicar los eventos de WebSocket sobre la lista del día sin volver a consultarla
+  useEventosTurnos(socket, {
+    alEvento: (evento) => {
+      setTurnosHoy((turnos) => aplicarEvento(turnos, evento, {
+        incluir: (turno) => new Date(turno.fecha_creacion) >= inicioDelDia(),
+        ordenar: (a, b) => new Date(b.fecha_creacion) - new Date(a.fecha_creacion)
+      }));
+    },
+    alResincronizar: () => cargarTurnosHoy()
+  });
 
   const cargarDatos = async () => {
     try {
@@ -81,8 +74,7 @@ const VAPDashboard = () => {
 
   const cargarTurnosHoy = async () => {
     try {
-      const response = await api.turnos.obtenerListaCompleta();
-      setTurnosHoy(response.data);
+      await api.turnos.obtenerListaCompleta({ alRecibirPagina: setTurnosHoy });
     } catch (error) {
       console.error('Error al cargar turnos:', error);
     }
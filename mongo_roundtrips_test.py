@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Mongo Round-Trip Budget Test for UNAD Queue Management System
+Calls the mutation endpoints in-process and counts the MongoDB operations
+each one issues, so the single-round-trip handlers cannot silently regress.
+
+Requires a reachable MongoDB (MONGO_URL); uses a throwaway database.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from collections import Counter
+from pathlib import Path
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ['DB_NAME'] = os.environ.get('ROUNDTRIPS_DB_NAME', 'turnos_roundtrips_test')
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+import server  # noqa: E402
+
+# Maximum MongoDB operations allowed per endpoint call
+PRESUPUESTO = {
+    "generar_turno": 3,          # servicio + contador + insert
+    "llamar_turno": 1,
+    "atender_turno": 1,
+    "cerrar_turno": 1,
+    "cancelar_turno_pendiente": 1,
+    "redirigir_turno": 2,        # servicio destino + update
+    "crear_usuario": 2,          # email duplicado + insert
+    "crear_servicio": 1,
+}
+
+OPERACIONES = {
+    "find", "find_one", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "aggregate", "bulk_write",
+}
+
+
+class ColeccionContada:
+    def __init__(self, coleccion, contador: Counter):
+        self._coleccion = coleccion
+        self._contador = contador
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._coleccion, nombre)
+        if nombre not in OPERACIONES:
+            return atributo
+
+        def contado(*args, **kwargs):
+            self._contador[f"{self._coleccion.name}.{nombre}"] += 1
+            return atributo(*args, **kwargs)
+        return contado
+
+
+class BaseContada:
+    def __init__(self, base):
+        self._base = base
+        self.contador = Counter()
+
+    def __getattr__(self, nombre):
+        return ColeccionContada(getattr(self._base, nombre), self.contador)
+
+    def __getitem__(self, nombre):
+        return ColeccionContada(self._base[nombre], self.contador)
+
+
+def crear_base():
+    return server.client[os.environ['DB_NAME']]
+
+
+def datos_turno(servicio_id: str, **extra) -> "server.TurnoCreate":
+    datos = {
+        "servicio_id": servicio_id,
+        "tipo_documento": "CC",
+        "numero_documento": "1234567890",
+        "nombre_completo": "Cliente Prueba",
+        "telefono": "3001234567",
+        "correo": "cliente@test.com",
+        "tipo_usuario": "estudiante",
+    }
+    datos.update(extra)
+    return server.TurnoCreate(**datos)
+
+
+async def medir(base: BaseContada, nombre: str, coro):
+    base.contador.clear()
+    resultado = await coro
+    total = sum(base.contador.values())
+    esperado = PRESUPUESTO[nombre]
+    estado = "✅ PASS" if total <= esperado else "❌ FAIL"
+    print(f"{estado} - {nombre}: {total} operaciones (máximo {esperado}) {dict(base.contador)}")
+    assert total <= esperado, f"{nombre} usó {total} operaciones, máximo {esperado}"
+    return resultado
+
+
+async def ejecutar(base_real=None):
+    base_real = base_real if base_real is not None else crear_base()
+    for coleccion in ("usuarios", "servicios", "turnos", "contadores", "configuracion"):
+        await base_real[coleccion].delete_many({})
+
+    base = BaseContada(base_real)
+    server.db = base
+    server.cache_usuarios.limpiar()
+    server.contadores_sembrados.clear()
+    server.prioridades_configuradas = None
+
+    admin = server.Usuario(
+        id=str(uuid.uuid4()), nombre="Admin Prueba", email="admin@test.com",
+        rol="administrador", fecha_creacion="2024-01-01T00:00:00+00:00"
+    )
+    servicio_a = await server.crear_servicio(server.ServicioCreate(nombre="Servicio A", prefijo="a"), usuario=admin)
+    servicio_b = await server.crear_servicio(server.ServicioCreate(nombre="Servicio B", prefijo="b"), usuario=admin)
+    funcionario = await server.crear_usuario(server.UsuarioCreate(
+        nombre="Funcionario Prueba", email="func@test.com", password="func123",
+        rol="funcionario", servicios_asignados=[servicio_a.id, servicio_b.id], modulo="Módulo 1"
+    ), usuario=admin)
+
+    # El primer turno siembra el contador; se mide a partir del segundo
+    await server.generar_turno(datos_turno(servicio_a.id), usuario=funcionario)
+
+    await medir(base, "crear_servicio",
+                server.crear_servicio(server.ServicioCreate(nombre="Servicio C", prefijo="c"), usuario=admin))
+    await medir(base, "crear_usuario", server.crear_usuario(server.UsuarioCreate(
+        nombre="VAP Prueba", email="vap@test.com", password="vap123", rol="vap"
+    ), usuario=admin))
+
+    turno = await medir(base, "generar_turno", server.generar_turno(datos_turno(servicio_a.id), usuario=funcionario))
+    await medir(base, "llamar_turno", server.llamar_turno(server.TurnoLlamar(turno_id=turno.id), usuario=funcionario))
+    await medir(base, "atender_turno", server.atender_turno(server.TurnoAtender(turno_id=turno.id), usuario=funcionario))
+    await medir(base, "cerrar_turno", server.cerrar_turno(server.TurnoCerrar(turno_id=turno.id), usuario=funcionario))
+
+    turno = await server.generar_turno(datos_turno(servicio_a.id), usuario=funcionario)
+    await medir(base, "redirigir_turno", server.redirigir_turno(
+        server.TurnoRedirigir(turno_id=turno.id, nuevo_servicio_id=servicio_b.id), usuario=funcionario))
+
+    turno = await server.generar_turno(datos_turno(servicio_a.id), usuario=funcionario)
+    await medir(base, "cancelar_turno_pendiente",
+                server.cancelar_turno_pendiente(server.TurnoCerrar(turno_id=turno.id), usuario=admin))
+
+    await base_real.client.drop_database(base_real.name)
+
+
+def test_mongo_roundtrips():
+    asyncio.run(ejecutar())
+
+
+if __name__ == "__main__":
+    print("🚀 Starting Mongo Round-Trip Budget Test")
+    print("=" * 60)
+    try:
+        test_mongo_roundtrips()
+    except AssertionError as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    print("\n✅ All endpoints within their round-trip budget")
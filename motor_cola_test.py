@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+In-Memory Queue Test for UNAD Queue Management System
+Exercises MotorCola and the pagination cursors directly: insertion and removal
+keys, attention order with priorities, overlapping reloads, and cursor
+round-trips and validation.
+
+Runs in-process; no MongoDB or network needed.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'turnos_cola_test')
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+import server  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+
+def turno(numero: int, servicio_id: str = "servicio-a", **extra) -> dict:
+    datos = {
+        "id": f"turno-{numero}",
+        "codigo": f"A{numero:03d}",
+        "servicio_id": servicio_id,
+        "servicio_nombre": "Servicio A",
+        "prioridad": None,
+        "prioridad_rango": server.RANGO_SIN_PRIORIDAD,
+        "estado": "creado",
+        "fecha_creacion": f"2024-01-01T08:00:{numero:02d}+00:00",
+    }
+    datos.update(extra)
+    return datos
+
+
+def ids(turnos: list) -> list:
+    return [t["id"] for t in turnos]
+
+
+def test_turno_sin_rango():
+    """Un turno sin prioridad_rango entra y sale de la cola con la misma clave"""
+    cola = server.MotorCola()
+    sin_rango = turno(1)
+    del sin_rango["prioridad_rango"]
+    cola.aplicar(sin_rango)
+    cola.aplicar(turno(2))
+    cola.aplicar(turno(3, prioridad_rango=None))
+    assert ids(cola.pagina()[0]) == ["turno-1", "turno-2", "turno-3"]
+
+    cola.aplicar({**sin_rango, "estado": "llamado"})
+    cola.aplicar({**turno(3), "estado": "llamado", "prioridad_rango": None})
+    assert ids(cola.pagina()[0]) == ["turno-2"]
+    assert cola.longitudes() == {"servicio-a": 1}
+    print("✅ PASS - turno sin prioridad_rango se agrega y se quita")
+
+
+def test_orden_y_prioridad():
+    """Prioritarios primero según su rango; dentro del mismo rango, por orden de llegada"""
+    cola = server.MotorCola()
+    for numero in (3, 1, 2):
+        cola.aplicar(turno(numero))
+    cola.aplicar(turno(4, prioridad="Embarazo", prioridad_rango=1))
+    cola.aplicar(turno(5, prioridad="Discapacidad", prioridad_rango=0))
+    cola.aplicar(turno(6, servicio_id="servicio-b"))
+    assert ids(cola.pagina(["servicio-a"])[0]) == ["turno-5", "turno-4", "turno-1", "turno-2", "turno-3"]
+    # Todas las colas se mezclan en el mismo orden de atención
+    assert ids(cola.pagina()[0]) == ["turno-5", "turno-4", "turno-1", "turno-2", "turno-3", "turno-6"]
+    print("✅ PASS - orden de atención con prioridad")
+
+
+def test_recargas_solapadas():
+    """Una recarga que empieza durante otra no reinstala un turno que ya fue llamado"""
+    class ColaPrueba(server.MotorCola):
+        def __init__(self):
+            super().__init__()
+            self.base = {}
+            self.liberar = []
+
+        async def _leer(self) -> list:
+            # Foto de la BD al empezar la lectura; devolverla se demora hasta que el test la libera
+            foto = [dict(t) for t in self.base.values() if t["estado"] == "creado"]
+            liberar = asyncio.Event()
+            self.liberar.append(liberar)
+            await liberar.wait()
+            return foto
+
+    async def ejecutar():
+        cola = ColaPrueba()
+        cola.base = {"turno-1": turno(1), "turno-2": turno(2)}
+        primera = asyncio.create_task(cola.cargar())
+        segunda = asyncio.create_task(cola.cargar())
+        await asyncio.sleep(0)
+
+        # Se llama el turno 1 mientras la primera recarga lee
+        cola.base["turno-1"] = {**turno(1), "estado": "llamado"}
+        cola.aplicar(cola.base["turno-1"])
+        cola.liberar[0].set()
+        await primera
+        assert ids(cola.pagina()[0]) == ["turno-2"]
+
+        # La segunda lee después de la primera y ya ve el turno llamado
+        await asyncio.sleep(0)
+        assert len(cola.liberar) == 2, "la segunda recarga leyó a la vez que la primera"
+        cola.liberar[1].set()
+        await segunda
+        assert ids(cola.pagina()[0]) == ["turno-2"]
+        assert cola.reconciliaciones == 2
+
+        # Sin recarga en curso, aplicar no acumula pendientes
+        cola.aplicar(turno(3))
+        assert cola._pendientes is None
+
+    asyncio.run(ejecutar())
+    print("✅ PASS - recargas solapadas no reinstalan turnos llamados")
+
+
+def test_paginacion_con_cursor():
+    """Las páginas recorren la cola completa una vez, pasando el cursor codificado"""
+    cola = server.MotorCola()
+    for numero in range(1, 8):
+        cola.aplicar(turno(numero))
+    cola.aplicar(turno(8, prioridad="Adulto Mayor", prioridad_rango=2))
+
+    vistos, despues = [], None
+    while True:
+        pagina, siguiente = cola.pagina(["servicio-a"], despues, 3)
+        vistos += ids(pagina)
+        if siguiente is None:
+            break
+        cursor = server.codificar_cursor(siguiente)
+        despues = server.decodificar_cursor(cursor, server.CURSOR_COLA)
+        assert despues == siguiente, "el cursor conserva la clave"
+    assert vistos == ["turno-8"] + [f"turno-{n}" for n in range(1, 8)]
+
+    # Un turno nuevo que entra por delante del cursor no se repite ni desplaza la página siguiente
+    pagina, siguiente = cola.pagina(["servicio-a"], None, 2)
+    cola.aplicar(turno(9, prioridad="Discapacidad", prioridad_rango=0))
+    assert ids(cola.pagina(["servicio-a"], siguiente, 2)[0]) == ["turno-2", "turno-3"]
+
+    lista = ("2024-01-01T08:00:00+00:00", "turno-1")
+    assert server.decodificar_cursor(server.codificar_cursor(lista), server.CURSOR_LISTA) == lista
+    print("✅ PASS - paginación con cursor")
+
+
+def test_cursor_invalido():
+    valido = server.codificar_cursor((0, "2024-01-01T08:00:00+00:00", "turno-1"))
+    for cursor, tipos in (("no es base64!", server.CURSOR_COLA),
+                          (server.codificar_cursor(("a", "b")), server.CURSOR_COLA),
+                          (server.codificar_cursor(("x", "b", "c")), server.CURSOR_COLA),
+                          (valido, server.CURSOR_LISTA),
+                          ("bnVsbA", server.CURSOR_LISTA)):
+        try:
+            server.decodificar_cursor(cursor, tipos)
+        except HTTPException as error:
+            assert error.status_code == 400
+        else:
+            raise AssertionError(f"cursor aceptado: {cursor}")
+
+    # El endpoint rechaza el cursor antes de consultar la cola
+    funcionario = server.Usuario(
+        id="funcionario-1", nombre="Funcionario Prueba", email="func@test.com", rol="funcionario",
+        servicios_asignados=["servicio-a"], fecha_creacion="2024-01-01T00:00:00+00:00"
+    )
+    try:
+        asyncio.run(server.obtener_todos_turnos(limite=2, cursor="basura", completo=False, usuario=funcionario))
+    except HTTPException as error:
+        assert error.status_code == 400, error.status_code
+    else:
+        raise AssertionError("/turnos/todos aceptó un cursor inválido")
+    print("✅ PASS - cursor inválido responde 400")
+
+
+if __name__ == "__main__":
+    print("🚀 Starting In-Memory Queue Test")
+    print("=" * 60)
+    try:
+        test_turno_sin_rango()
+        test_orden_y_prioridad()
+        test_recargas_solapadas()
+        test_paginacion_con_cursor()
+        test_cursor_invalido()
+    except AssertionError as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    print("\n✅ In-memory queue behaves as expected")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Packet Test for UNAD Queue Management System
+Feeds a real CONNECT and EVENT packet through the configured `sio` server and
+decodes what it sends back, so a wrong SOCKETIO_SERIALIZADOR cannot break
+every real-time update unnoticed.
+
+Runs in-process; no MongoDB or network needed.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'turnos_socketio_test')
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+import server  # noqa: E402
+from socketio import packet  # noqa: E402
+
+
+async def ejecutar():
+    sio = server.sio
+    enviados = []
+
+    async def enviar(eio_sid, datos):
+        enviados.append(sio.packet_class(encoded_packet=datos))
+
+    sio.eio.send = enviar
+    eio_sid = "eio-prueba"
+
+    # Cliente sin token: se conecta como pantalla pública
+    await sio._handle_eio_connect(eio_sid, {})
+    await sio._handle_eio_message(eio_sid, sio.packet_class(packet.CONNECT, data={}, namespace="/").encode())
+    await asyncio.sleep(0.05)
+    assert enviados and enviados[0].packet_type == packet.CONNECT, "no llegó la respuesta CONNECT"
+    sid = enviados[0].data["sid"]
+    assert server.SALA_PANTALLA in sio.rooms(sid), "el socket no entró a la sala de la pantalla"
+    print(f"✅ PASS - CONNECT ({server.SOCKETIO_SERIALIZADOR}): sid {sid}")
+
+    enviados.clear()
+    await sio._handle_eio_message(
+        eio_sid, sio.packet_class(packet.EVENT, data=["reanudar", {}], namespace="/", id=1).encode()
+    )
+    await asyncio.sleep(0.05)
+    assert enviados and enviados[0].packet_type == packet.ACK, "no llegó el ACK de reanudar"
+    respuesta = enviados[0].data[0]
+    assert respuesta["completo"] is False
+    assert respuesta["epoca"] == server.secuencias_salas.epoca
+    assert server.SALA_PANTALLA in respuesta["secuencias"]
+    print(f"✅ PASS - EVENT reanudar: ACK {respuesta}")
+
+    await sio._handle_eio_disconnect(eio_sid, sio.reason.CLIENT_DISCONNECT)
+
+
+def test_paquetes_socketio():
+    asyncio.run(ejecutar())
+
+
+if __name__ == "__main__":
+    print("🚀 Starting Socket.IO Packet Test")
+    print("=" * 60)
+    try:
+        test_paquetes_socketio()
+    except AssertionError as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    print("\n✅ Socket.IO packets round-trip through the server")
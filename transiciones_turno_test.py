@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Turno Transition Race Test for UNAD Queue Management System
+Fires concurrent lifecycle calls at the same turno in-process and checks that the
+conditional update lets exactly one through (200) and rejects the other (409),
+that a transition from the wrong state is rejected with 409, that concurrent
+llamar-siguiente calls claim different turnos in attention order, and that
+concurrent generar calls get unique, consecutive ticket codes.
+
+Requires a reachable MongoDB (MONGO_URL); uses a throwaway database.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ['DB_NAME'] = os.environ.get('TRANSICIONES_DB_NAME', 'turnos_transiciones_test')
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+import server  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+
+def datos_turno(servicio_id: str) -> "server.TurnoCreate":
+    return server.TurnoCreate(
+        servicio_id=servicio_id,
+        tipo_documento="CC",
+        numero_documento="1234567890",
+        nombre_completo="Cliente Prueba",
+        telefono="3001234567",
+        correo="cliente@test.com",
+        tipo_usuario="estudiante",
+    )
+
+
+def estado_http(resultado) -> int:
+    if isinstance(resultado, HTTPException):
+        return resultado.status_code
+    if isinstance(resultado, BaseException):
+        raise resultado
+    return 200
+
+
+async def carrera(nombre: str, *llamadas):
+    """Ejecuta las llamadas a la vez y exige exactamente un 200 y el resto 409"""
+    resultados = await asyncio.gather(*llamadas, return_exceptions=True)
+    estados = sorted(estado_http(resultado) for resultado in resultados)
+    esperado = [200] + [409] * (len(llamadas) - 1)
+    estado = "✅ PASS" if estados == esperado else "❌ FAIL"
+    print(f"{estado} - {nombre}: {estados}")
+    assert estados == esperado, f"{nombre}: se esperaba {esperado}, se obtuvo {estados}"
+    return next(resultado for resultado in resultados if not isinstance(resultado, BaseException))
+
+
+async def rechazada(nombre: str, llamada):
+    try:
+        await llamada
+    except HTTPException as error:
+        assert error.status_code == 409, f"{nombre}: se esperaba 409, se obtuvo {error.status_code}"
+        print(f"✅ PASS - {nombre}: 409")
+        return
+    raise AssertionError(f"{nombre}: la transición desde un estado incorrecto no fue rechazada")
+
+
+async def preparar(base) -> tuple:
+    """Base vacía con un servicio y dos funcionarios asignados a él"""
+    server.db = base if base is not None else server.client[os.environ['DB_NAME']]
+    for coleccion in ("usuarios", "servicios", "turnos", "contadores", "configuracion"):
+        await server.db[coleccion].delete_many({})
+    server.cache_usuarios.limpiar()
+    server.contadores_sembrados.clear()
+    server.prioridades_configuradas = None
+
+    admin = server.Usuario(
+        id=str(uuid.uuid4()), nombre="Admin Prueba", email="admin@test.com",
+        rol="administrador", fecha_creacion="2024-01-01T00:00:00+00:00"
+    )
+    servicio = await server.crear_servicio(server.ServicioCreate(nombre="Servicio A", prefijo="a"), usuario=admin)
+    funcionarios = [server.Usuario(
+        id=str(uuid.uuid4()), nombre=f"Funcionario {i}", email=f"func{i}@test.com", rol="funcionario",
+        servicios_asignados=[servicio.id], modulo=f"Módulo {i}", fecha_creacion="2024-01-01T00:00:00+00:00"
+    ) for i in (1, 2)]
+    return admin, servicio, funcionarios
+
+
+async def probar_transiciones(base):
+    _, servicio, funcionarios = await preparar(base)
+    turno = await server.generar_turno(datos_turno(servicio.id), usuario=funcionarios[0])
+    await rechazada("atender turno sin llamar",
+                    server.atender_turno(server.TurnoAtender(turno_id=turno.id), usuario=funcionarios[0]))
+
+    llamado = await carrera("llamar el mismo turno desde dos módulos", *(
+        server.llamar_turno(server.TurnoLlamar(turno_id=turno.id), usuario=funcionario)
+        for funcionario in funcionarios
+    ))
+    assert llamado.estado == "llamado"
+
+    atendido = await carrera("atender el mismo turno dos veces", *(
+        server.atender_turno(server.TurnoAtender(turno_id=turno.id), usuario=funcionario)
+        for funcionario in funcionarios
+    ))
+    assert atendido.estado == "atendiendo"
+
+    await rechazada("llamar un turno en atención",
+                    server.llamar_turno(server.TurnoLlamar(turno_id=turno.id), usuario=funcionarios[1]))
+
+
+async def probar_llamar_siguiente(base):
+    _, servicio, funcionarios = await preparar(base)
+    normal_1 = await server.generar_turno(datos_turno(servicio.id), usuario=funcionarios[0])
+    normal_2 = await server.generar_turno(datos_turno(servicio.id), usuario=funcionarios[0])
+    prioritario = await server.generar_turno(
+        datos_turno(servicio.id).model_copy(update={"prioridad": "Discapacidad"}), usuario=funcionarios[0]
+    )
+
+    # Dos módulos piden el siguiente a la vez: cada uno se lleva un turno distinto, el
+    # prioritario antes que los normales más antiguos y, entre los normales, el primero
+    llamados = await asyncio.gather(*(
+        server.llamar_siguiente_turno(server.TurnoLlamarSiguiente(), usuario=funcionario)
+        for funcionario in funcionarios
+    ))
+    assert {t.id for t in llamados} == {prioritario.id, normal_1.id}, [t.codigo for t in llamados]
+    assert all(t.estado == "llamado" for t in llamados)
+    assert {t.modulo for t in llamados} == {"Módulo 1", "Módulo 2"}
+    print(f"✅ PASS - llamar-siguiente desde dos módulos: {sorted(t.codigo for t in llamados)}")
+
+    # Sin servicios asignados no hay cola que reclamar, aunque queden turnos abiertos
+    sin_servicios = funcionarios[0].model_copy(update={"servicios_asignados": []})
+    try:
+        await server.llamar_siguiente_turno(server.TurnoLlamarSiguiente(), usuario=sin_servicios)
+    except HTTPException as error:
+        assert error.status_code == 404, error.status_code
+    else:
+        raise AssertionError("llamar-siguiente sin servicios asignados reclamó un turno")
+    print("✅ PASS - llamar-siguiente sin servicios asignados: 404")
+
+    siguiente = await server.llamar_siguiente_turno(server.TurnoLlamarSiguiente(), usuario=funcionarios[0])
+    assert siguiente.id == normal_2.id
+    try:
+        await server.llamar_siguiente_turno(server.TurnoLlamarSiguiente(), usuario=funcionarios[1])
+    except HTTPException as error:
+        assert error.status_code == 404, error.status_code
+    else:
+        raise AssertionError("llamar-siguiente con la cola vacía reclamó un turno")
+    print("✅ PASS - llamar-siguiente en orden de llegada hasta vaciar la cola")
+
+
+def numero(codigo: str) -> int:
+    return int(codigo.rsplit("-", 1)[1])
+
+
+async def probar_codigos(base):
+    admin, servicio, funcionarios = await preparar(base)
+    turnos = await asyncio.gather(*(
+        server.generar_turno(datos_turno(servicio.id), usuario=funcionarios[i % 2]) for i in range(20)
+    ))
+    codigos = [t.codigo for t in turnos]
+    assert len(set(codigos)) == 20, f"códigos repetidos: {sorted(codigos)}"
+    assert sorted(numero(codigo) for codigo in codigos) == list(range(1, 21)), sorted(codigos)
+    print("✅ PASS - 20 turnos generados a la vez: códigos únicos y consecutivos")
+
+    # Turnos emitidos antes de que existiera el contador: el contador nuevo parte del último
+    ayer = (server.inicio_dia_local() - timedelta(hours=1)).isoformat()
+    hoy = datetime.now(timezone.utc).isoformat()
+    servicios = {}
+    for prefijo, previos in (("b", [("B-050", ayer)]), ("c", [("C-050", ayer), ("C-004", hoy)]),
+                             ("d", [("D-050", ayer)])):
+        servicios[prefijo] = await server.crear_servicio(
+            server.ServicioCreate(nombre=f"Servicio {prefijo}", prefijo=prefijo), usuario=admin
+        )
+        await server.db.turnos.insert_many([
+            {"id": str(uuid.uuid4()), "servicio_id": servicios[prefijo].id, "codigo": codigo,
+             "estado": "finalizado", "fecha_creacion": fecha}
+            for codigo, fecha in previos
+        ])
+
+    async def generar(prefijo: str) -> str:
+        turno = await server.generar_turno(datos_turno(servicios[prefijo].id), usuario=admin)
+        return turno.codigo
+
+    assert await generar("b") == "B-051", "sin reinicio diario la numeración continúa"
+    reinicio = server.REINICIO_DIARIO_CODIGOS
+    server.REINICIO_DIARIO_CODIGOS = True
+    try:
+        assert await generar("c") == "C-005", "con reinicio diario se siembra con el último código de hoy"
+        assert await generar("d") == "D-001", "con reinicio diario los códigos de ayer no cuentan"
+        dia = server.inicio_dia_local().astimezone(server.ZONA_HORARIA).date().isoformat()
+        contador = await server.db.contadores.find_one({"_id": f"{servicios['d'].id}:{dia}"})
+        assert contador is not None and contador["valor"] == 1, contador
+    finally:
+        server.REINICIO_DIARIO_CODIGOS = reinicio
+    print("✅ PASS - contador sembrado con los códigos existentes, con y sin reinicio diario")
+
+
+async def ejecutar(base=None):
+    await probar_transiciones(base)
+    await probar_llamar_siguiente(base)
+    await probar_codigos(base)
+    if base is None:
+        await server.client.drop_database(os.environ['DB_NAME'])
+
+
+def test_transiciones_concurrentes():
+    asyncio.run(ejecutar())
+
+
+if __name__ == "__main__":
+    print("🚀 Starting Turno Transition Race Test")
+    print("=" * 60)
+    try:
+        test_transiciones_concurrentes()
+    except AssertionError as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    print("\n✅ Concurrent transitions resolve to one winner")
@@ -128,7 +128,7 @@ class WebSocketTester:
             
         @self.sio.event
         def turno_generado(data):
-            print(f"    📨 Received 'turno_generado' event: {data.get('codigo', 'N/A')}")
+            print(f"    📨 Received 'turno_generado' event: {data.get('cambios', {}).get('codigo', 'N/A')} (seq {data.get('seq')})")
             self.events_received.append({
                 'event': 'turno_generado',
                 'data': data,
@@ -137,7 +137,7 @@ class WebSocketTester:
             
         @self.sio.event
         def turno_llamado(data):
-            print(f"    📨 Received 'turno_llamado' event: {data.get('codigo', 'N/A')}")
+            print(f"    📨 Received 'turno_llamado' event: {data.get('cambios', {}).get('codigo', 'N/A')} (seq {data.get('seq')})")
             self.events_received.append({
                 'event': 'turno_llamado',
                 'data': data,
@@ -146,7 +146,7 @@ class WebSocketTester:
             
         @self.sio.event
         def turno_atendiendo(data):
-            print(f"    📨 Received 'turno_atendiendo' event: {data.get('codigo', 'N/A')}")
+            print(f"    📨 Received 'turno_atendiendo' event: {data.get('cambios', {}).get('codigo', 'N/A')} (seq {data.get('seq')})")
             self.events_received.append({
                 'event': 'turno_atendiendo',
                 'data': data,
@@ -155,7 +155,7 @@ class WebSocketTester:
             
         @self.sio.event
         def turno_finalizado(data):
-            print(f"    📨 Received 'turno_finalizado' event: {data.get('codigo', 'N/A')}")
+            print(f"    📨 Received 'turno_finalizado' event: {data.get('cambios', {}).get('codigo', 'N/A')} (seq {data.get('seq')})")
             self.events_received.append({
                 'event': 'turno_finalizado',
                 'data': data,
@@ -164,7 +164,7 @@ class WebSocketTester:
             
         @self.sio.event
         def turno_cancelado(data):
-            print(f"    📨 Received 'turno_cancelado' event: {data.get('codigo', 'N/A')}")
+            print(f"    📨 Received 'turno_cancelado' event: {data.get('cambios', {}).get('codigo', 'N/A')} (seq {data.get('seq')})")
             self.events_received.append({
                 'event': 'turno_cancelado',
                 'data': data,
@@ -180,7 +180,9 @@ class WebSocketTester:
             
             # Attempt to connect
             print(f"    Connecting to: {self.socket_url}")
-            self.sio.connect(self.socket_url, socketio_path='socket.io')
+            # With a VAP token the socket joins the VAP room, which receives every turno event
+            auth = {'token': self.tokens['vap']} if 'vap' in self.tokens else None
+            self.sio.connect(self.socket_url, socketio_path='socket.io', auth=auth)
             
             # Wait a moment for connection to establish
             time.sleep(2)